@@ -1,5 +1,164 @@
+import argparse
+import asyncio
+import bisect
+import copy
+import csv
+import gzip
+import io
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager, redirect_stdout
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # Optional: search_many falls back to plain Python
+    np = None
+
+
+def _is_prime(n):
+    """Check whether n is a prime number"""
+    if n < 2:
+        return False
+    if n % 2 == 0:
+        return n == 2
+    i = 3
+    while i * i <= n:
+        if n % i == 0:
+            return False
+        i += 2
+    return True
+
+
+def _next_prime(n):
+    """Return the smallest prime greater than or equal to n"""
+    while not _is_prime(n):
+        n += 1
+    return n
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _rotl64(x, b):
+    """Rotate a 64-bit integer left by b bits"""
+    return ((x << b) | (x >> (64 - b))) & _MASK64
+
+
+def _mix64(x):
+    """splitmix64 finalizer: spread the bits of a 64-bit integer"""
+    x &= _MASK64
+    x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _sum_hash(key, seed):
+    """Original hash: sum of character codes (anagrams collide, seed unused)"""
+    return sum(ord(c) for c in key)
+
+
+def _fnv1a_hash(key, seed):
+    """64-bit FNV-1a over the UTF-8 bytes of key, offset basis mixed with seed"""
+    h = 0xcbf29ce484222325 ^ (seed & _MASK64)
+    for byte in key.encode("utf-8"):
+        h = ((h ^ byte) * 0x100000001b3) & _MASK64
+    return h
+
+
+def _siphash(key, seed):
+    """SipHash-2-4 of the UTF-8 bytes of key, keyed with the 128-bit seed"""
+    data = key.encode("utf-8")
+    k0 = seed & _MASK64
+    k1 = (seed >> 64) & _MASK64
+    v = [k0 ^ 0x736f6d6570736575, k1 ^ 0x646f72616e646f6d,
+         k0 ^ 0x6c7967656e657261, k1 ^ 0x7465646279746573]
+
+    def sip_round():
+        v[0] = (v[0] + v[1]) & _MASK64
+        v[1] = _rotl64(v[1], 13) ^ v[0]
+        v[0] = _rotl64(v[0], 32)
+        v[2] = (v[2] + v[3]) & _MASK64
+        v[3] = _rotl64(v[3], 16) ^ v[2]
+        v[0] = (v[0] + v[3]) & _MASK64
+        v[3] = _rotl64(v[3], 21) ^ v[0]
+        v[2] = (v[2] + v[1]) & _MASK64
+        v[1] = _rotl64(v[1], 17) ^ v[2]
+        v[2] = _rotl64(v[2], 32)
+
+    # Message blocks, with the length in the top byte of the final block
+    tail = len(data) % 8
+    padded = data[:len(data) - tail] + data[len(data) - tail:].ljust(7, b"\0")
+    padded += bytes([len(data) & 0xff])
+    for offset in range(0, len(padded), 8):
+        m = int.from_bytes(padded[offset:offset + 8], "little")
+        v[3] ^= m
+        sip_round()
+        sip_round()
+        v[0] ^= m
+
+    v[2] ^= 0xff
+    for _ in range(4):
+        sip_round()
+    return v[0] ^ v[1] ^ v[2] ^ v[3]
+
+
+def _builtin_hash(key, seed):
+    """Python's built-in hash combined with the seed (varies between processes)"""
+    return hash((seed, key)) & _MASK64
+
+
+# String hash strategies selectable with HashTable(hash_strategy=...)
+HASH_STRATEGIES = {
+    "sum": _sum_hash,
+    "fnv1a": _fnv1a_hash,
+    "siphash": _siphash,
+    "builtin": _builtin_hash,
+}
+
+
+class _Tombstone:
+    """Marker left in an open-addressing slot whose record has been moved out"""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<deleted>"
+
+
+_TOMBSTONE = _Tombstone()
+
+# Swiss table control bytes: a full slot holds the 7-bit hash fragment of its
+# key, so the high bit alone tells free slots from full ones
+_CTRL_EMPTY = 0x80
+_CTRL_DELETED = 0xFE
+# Slots per control group and the per-byte masks used to scan a whole group
+# as one integer
+_GROUP_WIDTH = 16
+_GROUP_LSB = int.from_bytes(b"\x01" * _GROUP_WIDTH, "little")
+_GROUP_MSB = _GROUP_LSB * 0x80
+
+# Probe-length histograms count lengths 0..63 exactly; the last bucket holds
+# everything longer
+_HISTOGRAM_BUCKETS = 64
+# Upper bounds of the buckets exported as a Prometheus histogram
+_PROMETHEUS_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
 class TelephoneRecord:
     """A class to store telephone record data"""
+    __slots__ = ("name", "tel_no")
+
     def __init__(self, name, tel_no):
         self.name = name
         self.tel_no = tel_no
@@ -10,33 +169,593 @@ class TelephoneRecord:
 
 class Node:
     """Node class for linked list implementation in chaining"""
+    __slots__ = ("data", "next")
+
     def __init__(self, data=None):
         self.data = data  # Can be a TelephoneRecord or raw phone number
         self.next = None
 
 
+# Attribute no object has: getattr(item, _DIRECT_COMPARE, item) is the item itself
+_DIRECT_COMPARE = "\0direct"
+
+
+def _key_field(key):
+    """Record attribute a search key is compared with"""
+    if isinstance(key, str):
+        return "name"
+    elif isinstance(key, int):
+        return "tel_no"
+    return _DIRECT_COMPARE
+
+
+# Name length markers used by the compact storage columns
+_EMPTY_ENTRY = -1
+_DELETED_ENTRY = -2
+_NUMBER_ENTRY = -3  # A bare integer key with no name
+
+# HashTable.save() file layout: magic, header length, JSON header, then the
+# columns, each padded to 8 bytes so they can be mapped and cast in place
+_SNAPSHOT_MAGIC = b"DSALHT01"
+_SNAPSHOT_ALIGN = 8
+
+
+class _CompactColumns:
+    """Shared column encoding for the compact storage layouts
+
+    Numbers live in an array('q'), names are UTF-8 packed into one bytearray
+    and addressed by offset/length, so no per-record Python object is kept.
+    Bytes of overwritten and freed names are counted in dead_bytes; the
+    bytearray is repacked once they exceed MAX_DEAD_RATIO of it.
+    """
+
+    MAX_DEAD_RATIO = 0.5
+    MIN_DEAD_BYTES = 4096  # Smaller blobs are not worth repacking
+    dead_bytes = 0
+
+    @classmethod
+    def _wrap(cls, **columns):
+        """Build a layout around existing columns (arrays or memoryviews of a snapshot)"""
+        layout = cls.__new__(cls)
+        for name, column in columns.items():
+            setattr(layout, name, column)
+        return layout
+
+    def _init_columns(self, size):
+        self.numbers = array('q', [0]) * size
+        self.name_offsets = array('q', [0]) * size
+        self.name_lengths = array('i', [_EMPTY_ENTRY]) * size
+        self.names = bytearray()
+
+    def _read(self, i):
+        """Materialize entry i as a record, bare number, tombstone or None"""
+        length = self.name_lengths[i]
+        if length >= 0:
+            offset = self.name_offsets[i]
+            return TelephoneRecord(str(self.names[offset:offset + length], "utf-8"),
+                                   self.numbers[i])
+        elif length == _NUMBER_ENTRY:
+            return self.numbers[i]
+        elif length == _DELETED_ENTRY:
+            return _TOMBSTONE
+        return None
+
+    def _write(self, i, value):
+        """Encode value into entry i"""
+        length = self.name_lengths[i]
+        if isinstance(value, TelephoneRecord):
+            encoded = value.name.encode("utf-8")
+            offset = self.name_offsets[i]
+            # Updates usually keep the name: reuse its bytes
+            if length != len(encoded) or self.names[offset:offset + length] != encoded:
+                if length > 0:
+                    self.dead_bytes += length
+                self.name_offsets[i] = len(self.names)
+                self.name_lengths[i] = len(encoded)
+                self.names += encoded
+            self.numbers[i] = value.tel_no
+        else:
+            if value is None:
+                self.name_lengths[i] = _EMPTY_ENTRY
+            elif value is _TOMBSTONE:
+                self.name_lengths[i] = _DELETED_ENTRY
+            elif isinstance(value, int):
+                self.numbers[i] = value
+                self.name_lengths[i] = _NUMBER_ENTRY
+            else:
+                raise TypeError("Compact storage only holds TelephoneRecords and integers")
+            if length > 0:
+                self.dead_bytes += length
+        if (self.dead_bytes > self.MIN_DEAD_BYTES
+                and self.dead_bytes > self.MAX_DEAD_RATIO * len(self.names)):
+            self._compact_names()
+
+    def _compact_names(self):
+        """Repack the live names into a new bytearray, dropping dead bytes"""
+        names = bytearray()
+        offsets = self.name_offsets
+        lengths = self.name_lengths
+        old = self.names
+        for i in range(len(lengths)):
+            length = lengths[i]
+            if length > 0:
+                offset = offsets[i]
+                offsets[i] = len(names)
+                names += old[offset:offset + length]
+        self.names = names
+        self.dead_bytes = 0
+
+    def nbytes(self):
+        """Approximate memory held by the columns"""
+        return sum(sys.getsizeof(column) for column in
+                   (self.numbers, self.name_offsets, self.name_lengths, self.names))
+
+
+class _CompactSlots(_CompactColumns):
+    """Columnar slot array for open addressing, indexed like a list"""
+
+    def __init__(self, size):
+        self._init_columns(size)
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __getitem__(self, index):
+        return self._read(index)
+
+    def __setitem__(self, index, value):
+        self._write(index, value)
+
+    def __iter__(self):
+        for i in range(len(self.numbers)):
+            yield self._read(i)
+
+
+class _CompactChain:
+    """List-like view of one bucket of _CompactChains"""
+    __slots__ = ("chains", "bucket")
+
+    def __init__(self, chains, bucket):
+        self.chains = chains
+        self.bucket = bucket
+
+    def _entries(self):
+        entry = self.chains.heads[self.bucket]
+        while entry != -1:
+            yield entry
+            entry = self.chains.nexts[entry]
+
+    def _entry_at(self, position):
+        for i, entry in enumerate(self._entries()):
+            if i == position:
+                return entry
+        raise IndexError("chain index out of range")
+
+    def __iter__(self):
+        for entry in self._entries():
+            yield self.chains._read(entry)
+
+    def __len__(self):
+        return sum(1 for _ in self._entries())
+
+    def __getitem__(self, position):
+        return self.chains._read(self._entry_at(position))
+
+    def __setitem__(self, position, record):
+        self.chains._write(self._entry_at(position), record)
+
+    def __delitem__(self, position):
+        chains = self.chains
+        previous = -1
+        for i, entry in enumerate(self._entries()):
+            if i == position:
+                if previous == -1:
+                    chains.heads[self.bucket] = chains.nexts[entry]
+                else:
+                    chains.nexts[previous] = chains.nexts[entry]
+                chains._free_entry(entry)
+                return
+            previous = entry
+        raise IndexError("chain index out of range")
+
+    def append(self, record):
+        chains = self.chains
+        entry = chains._new_entry(record)
+        last = -1
+        for last in self._entries():
+            pass
+        if last == -1:
+            chains.heads[self.bucket] = entry
+        else:
+            chains.nexts[last] = entry
+
+
+class _CompactChains(_CompactColumns):
+    """Separate chaining as linked entries in parallel arrays, indexed like a list
+
+    heads[bucket] is the first entry of a chain and nexts[entry] links the
+    rest; freed entries are reused before the columns grow.
+    """
+
+    def __init__(self, size):
+        self.heads = array('q', [-1]) * size
+        self.nexts = array('q')
+        self.free_entries = array('q')
+        self._init_columns(0)
+
+    def __len__(self):
+        return len(self.heads)
+
+    def __getitem__(self, bucket):
+        if not 0 <= bucket < len(self.heads):
+            raise IndexError("bucket index out of range")
+        return _CompactChain(self, bucket)
+
+    def __setitem__(self, bucket, records):
+        chain = _CompactChain(self, bucket)
+        for entry in list(chain._entries()):
+            self._free_entry(entry)
+        self.heads[bucket] = -1
+        for record in records:
+            chain.append(record)
+
+    def __iter__(self):
+        for bucket in range(len(self.heads)):
+            yield _CompactChain(self, bucket)
+
+    def _new_entry(self, record):
+        if self.free_entries:
+            entry = self.free_entries.pop()
+        else:
+            entry = len(self.nexts)
+            self.nexts.append(-1)
+            self.numbers.append(0)
+            self.name_offsets.append(0)
+            self.name_lengths.append(_EMPTY_ENTRY)
+        self.nexts[entry] = -1
+        self._write(entry, record)
+        return entry
+
+    def _free_entry(self, entry):
+        self._write(entry, None)
+        self.free_entries.append(entry)
+
+    def nbytes(self):
+        return (super().nbytes() + sys.getsizeof(self.heads) + sys.getsizeof(self.nexts)
+                + sys.getsizeof(self.free_entries))
+
+
 class HashTable:
     """Generic hash table with multiple collision handling techniques"""
+
+    METHODS = ("separate_chaining", "linear_probing", "quadratic_probing", "double_hashing",
+               "robin_hood", "cuckoo", "swiss_table")
+
+    # Cuckoo hashing: slots per bucket, stash entries before a rebuild, and
+    # evictions tried before a record is parked in the stash
+    CUCKOO_BUCKET_SIZE = 4
+    CUCKOO_STASH_SIZE = 4
+    CUCKOO_MAX_KICKS = 64
     
-    def __init__(self, size=100, method="separate_chaining"):
-        """Initialize hash table with specified size and collision handling method"""
-        self.size = size
+    def __init__(self, size=100, method="separate_chaining", max_load_factor=None,
+                 min_load_factor=None, incremental_rehash=False, rehash_step=4,
+                 hash_strategy="fnv1a", hash_seed=0, max_tombstone_ratio=0.25,
+                 storage="objects", key_type=None, metrics=False):
+        """Initialize hash table with specified size and collision handling method
+
+        When max_load_factor / min_load_factor are given the table grows or
+        shrinks to a prime capacity as the load crosses them. With
+        incremental_rehash the records are migrated rehash_step buckets at a
+        time during later operations instead of all at once.
+
+        hash_strategy picks the string hash from HASH_STRATEGIES, seeded with
+        hash_seed. Integer keys (telephone numbers) are used as they are.
+
+        Deleting from an open-addressing table leaves a tombstone; once they
+        exceed max_tombstone_ratio of the slots the table is rehashed in place.
+
+        storage="compact" keeps records in packed columns instead of one
+        TelephoneRecord per entry, trading lookup speed for a much smaller
+        footprint. Only TelephoneRecords and integer keys can be stored.
+
+        key_type declares a typed table holding only TelephoneRecords:
+        "name" hashes records by name, "number" by telephone number so that
+        search(tel_no) goes straight to the record. The default (None) also
+        accepts bare keys and hashes records by name.
+
+        metrics=True starts with instrumentation on, see enable_metrics().
+        """
+        if key_type not in (None, "name", "number"):
+            raise ValueError(f"Invalid key type: {key_type}")
+        if storage not in ("objects", "compact"):
+            raise ValueError(f"Invalid storage mode: {storage}")
+        if hash_strategy not in HASH_STRATEGIES:
+            raise ValueError(f"Invalid hash strategy: {hash_strategy}")
+        if (max_load_factor is not None and min_load_factor is not None
+                and min_load_factor * 2 >= max_load_factor):
+            raise ValueError("min_load_factor must be less than half of max_load_factor")
+        if (max_load_factor is not None and max_load_factor >= 1
+                and method != "separate_chaining"):
+            raise ValueError("max_load_factor must be below 1 for open addressing")
+        if rehash_step < 1:
+            raise ValueError("rehash_step must be at least 1")
+
         self.method = method
         self.comparison_count = 0
-        
-        # Initialize appropriate data structure based on method
-        if method == "separate_chaining":
-            self.table = [[] for _ in range(size)]
-        elif method in ["linear_probing", "quadratic_probing", "double_hashing"]:
-            self.table = [None] * size
+        self.count = 0
+        self.max_load_factor = max_load_factor
+        self.min_load_factor = min_load_factor
+        self.incremental_rehash = incremental_rehash
+        self.rehash_step = rehash_step
+        self.resize_count = 0
+        self.max_tombstone_ratio = max_tombstone_ratio
+        self.compaction_count = 0
+        # Wall time spent allocating and migrating during resizes
+        self.rehash_seconds = 0.0
+        self.hash_strategy = hash_strategy
+        self.hash_seed = hash_seed
+        self.storage = storage
+        self.key_type = key_type
+        self._string_hash = HASH_STRATEGIES[hash_strategy]
+        # Attribute a stored record is keyed (hashed and matched) by
+        self._record_field = "tel_no" if key_type == "number" else "name"
+
+        # Previous table and migration cursor while an incremental rehash runs
+        self._old = None
+        self._rehash_index = 0
+        # Bumped on every rebuild so cuckoo tables get a fresh second hash
+        self._rehash_seed = 0
+
+        # Set for tables served straight from a memory-mapped snapshot
+        self.read_only = False
+
+        # Per-operation instrumentation, off unless enable_metrics() is called
+        self._histograms = None
+        self._operations = None
+
+        self._allocate(size)
+        # Never shrink below the starting capacity (as rounded by _allocate)
+        self.min_size = self.size
+        if metrics:
+            self.enable_metrics()
+
+    def __len__(self):
+        return self.count
+
+    @classmethod
+    def from_records(cls, records, method="separate_chaining", load_factor=0.5, min_size=2,
+                     **options):
+        """Build a table presized for records ((name, tel_no) pairs or TelephoneRecords)
+
+        Raises ValueError if a record cannot be placed.
+        """
+        if not hasattr(records, '__len__'):
+            records = list(records)
+        size = _next_prime(max(int(len(records) / load_factor) + 1, min_size, 2))
+        table = cls(size, method, **options)
+
+        # Pick the insert routine once instead of dispatching per record
+        insert = {
+            "separate_chaining": table._insert_chaining,
+            "linear_probing": table._insert_linear_probing,
+            "quadratic_probing": table._insert_quadratic_probing,
+            "double_hashing": table._insert_double_hashing,
+            "robin_hood": table._insert_robin_hood,
+            "cuckoo": table._insert_cuckoo,
+            "swiss_table": table._insert_swiss_table,
+        }[method]
+        hash_function = table.hash_function
+        field = table._record_field
+        for record in records:
+            if not isinstance(record, TelephoneRecord):
+                record = TelephoneRecord(*record)
+            key = getattr(record, field)
+            if not insert(hash_function(key), record, key, field):
+                raise ValueError(f"Could not place {key!r} in a {method} table of size {size}")
+        table._check_stash()
+        return table
+
+    def records(self):
+        """Yield every record stored in the table"""
+        self._finish_rehash()
+        yield from self._stored_records()
+
+    def _stored_records(self):
+        """Yield the records in this table's own slots, ignoring a pending rehash"""
+        if self.method == "separate_chaining":
+            for chain in self.table:
+                yield from chain
+        else:
+            for item in self.table:
+                if item is not None and item is not _TOMBSTONE:
+                    yield item
+            if self.stash:
+                yield from self.stash
+
+    # Table attributes restored from a snapshot header
+    _SNAPSHOT_FIELDS = ("method", "size", "count", "tombstones", "hash_strategy", "hash_seed",
+                        "storage", "key_type", "max_load_factor", "min_load_factor",
+                        "incremental_rehash", "rehash_step", "max_tombstone_ratio",
+                        "min_size", "resize_count", "compaction_count", "_rehash_seed")
+
+    def save(self, path):
+        """Write the slot layout to a binary snapshot file
+
+        Records are stored as in compact storage: packed numbers, name
+        offsets/lengths and one UTF-8 name blob, plus the method's own
+        arrays (chain links, robin hood distances, swiss control bytes,
+        the cuckoo stash). The builtin string hash is salted per process,
+        so tables using it cannot be saved.
+        """
+        if self.hash_strategy == "builtin":
+            raise ValueError("The builtin hash differs between processes; use another strategy")
+        self._finish_rehash()
+
+        if self.storage == "compact":
+            layout = self.table
+        elif self.method == "separate_chaining":
+            layout = _CompactChains(self.size)
+            for bucket, chain in enumerate(self.table):
+                layout[bucket] = chain
+        else:
+            layout = _CompactSlots(self.size)
+            for i, item in enumerate(self.table):
+                layout[i] = item
+        columns = {
+            "numbers": layout.numbers,
+            "name_offsets": layout.name_offsets,
+            "name_lengths": layout.name_lengths,
+            "names": layout.names,
+        }
+        if self.method == "separate_chaining":
+            columns.update(heads=layout.heads, nexts=layout.nexts,
+                           free_entries=layout.free_entries)
+        if self.distances is not None:
+            columns["distances"] = self.distances
+        if self.ctrl is not None:
+            columns["ctrl"] = self.ctrl
+        if self.stash is not None:
+            stash = _CompactSlots(len(self.stash))
+            for i, item in enumerate(self.stash):
+                stash[i] = item
+            columns.update(stash_numbers=stash.numbers, stash_name_offsets=stash.name_offsets,
+                           stash_name_lengths=stash.name_lengths, stash_names=stash.names)
+
+        header = {field: getattr(self, field) for field in self._SNAPSHOT_FIELDS}
+        header["byteorder"] = sys.byteorder
+        sections = header["sections"] = {}
+        offset = 0
+        for name, column in columns.items():
+            data = memoryview(column).cast("B")
+            typecode = column.typecode if isinstance(column, array) else "B"
+            sections[name] = [offset, len(data), typecode]
+            offset += -(-len(data) // _SNAPSHOT_ALIGN) * _SNAPSHOT_ALIGN
+
+        encoded = json.dumps(header).encode("utf-8")
+        # Pad the header too, so the first column starts aligned
+        start = -(-(len(_SNAPSHOT_MAGIC) + 4 + len(encoded)) // _SNAPSHOT_ALIGN) * _SNAPSHOT_ALIGN
+        with open(path, "wb") as f:
+            f.write(_SNAPSHOT_MAGIC)
+            f.write(struct.pack("<I", len(encoded)))
+            f.write(encoded.ljust(start - len(_SNAPSHOT_MAGIC) - 4))
+            for name, column in columns.items():
+                data = memoryview(column).cast("B")
+                f.write(data)
+                f.write(bytes(-len(data) % _SNAPSHOT_ALIGN))
+
+    @classmethod
+    def load(cls, path, use_mmap=False):
+        """Rebuild a table from a save() snapshot
+
+        With use_mmap=True nothing is deserialized: the file is mapped
+        read-only and the table searches the mapped columns in place, so
+        loading is O(1) and processes mapping the same file share one copy
+        in the page cache. Such a table always behaves as compact storage
+        and rejects inserts and deletes.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(_SNAPSHOT_MAGIC)) != _SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a hash table snapshot")
+            header = json.loads(f.read(struct.unpack("<I", f.read(4))[0]))
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError("Snapshot was written on a machine with another byte order")
+            start = f.tell()
+            start += -start % _SNAPSHOT_ALIGN
+            if use_mmap:
+                buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                f.seek(start)
+                buffer = memoryview(f.read())
+                start = 0
+
+        columns = {}
+        for name, (offset, length, typecode) in header.pop("sections").items():
+            data = buffer[start + offset:start + offset + length]
+            if use_mmap:
+                columns[name] = data.cast(typecode) if typecode != "B" else data
+            elif typecode == "B":
+                columns[name] = bytearray(data)
+            else:
+                column = array(typecode)
+                column.frombytes(data)
+                columns[name] = column
+
+        # Start tiny and swap the saved arrays in, instead of allocating size slots
+        table = cls(1, header["method"], hash_strategy=header["hash_strategy"],
+                    hash_seed=header["hash_seed"], storage="compact",
+                    key_type=header["key_type"])
+        del header["byteorder"]
+        for field, value in header.items():
+            setattr(table, field, value)
+        table._quadratic = cls._quadratic_probes(table.size)
+        table.distances = columns.get("distances")
+        table.ctrl = columns.get("ctrl")
+        record_columns = {name: columns[name]
+                          for name in ("numbers", "name_offsets", "name_lengths", "names")}
+        if table.method == "separate_chaining":
+            layout = _CompactChains._wrap(heads=columns["heads"], nexts=columns["nexts"],
+                                          free_entries=columns["free_entries"],
+                                          **record_columns)
+        else:
+            layout = _CompactSlots._wrap(**record_columns)
+        if "stash_numbers" in columns:
+            stash = _CompactSlots._wrap(numbers=columns["stash_numbers"],
+                                        name_offsets=columns["stash_name_offsets"],
+                                        name_lengths=columns["stash_name_lengths"],
+                                        names=columns["stash_names"])
+            table.stash = list(stash)
+
+        if use_mmap:
+            table.storage = "compact"
+            table.table = layout
+            table.read_only = True
+        elif table.storage == "compact":
+            table.table = layout
+        elif table.method == "separate_chaining":
+            table.table = [list(chain) for chain in layout]
+        else:
+            table.table = list(layout)
+        return table
+
+    def _allocate(self, size):
+        """Start over with size empty slots"""
+        if self.method == "cuckoo":
+            # Whole buckets only
+            width = self.CUCKOO_BUCKET_SIZE
+            size = max(width, -(-size // width) * width)
+        elif self.method == "swiss_table":
+            # Whole control groups only
+            size = max(_GROUP_WIDTH, -(-size // _GROUP_WIDTH) * _GROUP_WIDTH)
+        self.size = size
+        self.table = self._new_table(size)
+        self._quadratic = self._quadratic_probes(size)
+        self.tombstones = 0
+        # Robin hood keeps each slot's distance from its home slot (-1 if empty)
+        self.distances = array('i', [-1]) * size if self.method == "robin_hood" else None
+        # Cuckoo records that could not be placed after CUCKOO_MAX_KICKS evictions
+        self.stash = [] if self.method == "cuckoo" else None
+        # Swiss table control byte per slot, scanned a group at a time
+        self.ctrl = bytearray([_CTRL_EMPTY]) * size if self.method == "swiss_table" else None
+
+    def _new_table(self, size):
+        """Create an empty slot array for the collision handling method"""
+        if self.method == "separate_chaining":
+            if self.storage == "compact":
+                return _CompactChains(size)
+            return [[] for _ in range(size)]
+        elif self.method in ["linear_probing", "quadratic_probing", "double_hashing",
+                             "robin_hood", "cuckoo", "swiss_table"]:
+            if self.storage == "compact":
+                return _CompactSlots(size)
+            return [None] * size
         else:
             raise ValueError("Invalid collision handling method")
-    
+
     def hash_function(self, key):
         """Primary hash function"""
         if isinstance(key, str):
             # For string keys (like names)
-            return sum(ord(c) for c in key) % self.size
+            return self._string_hash(key, self.hash_seed) % self.size
         elif isinstance(key, int):
             # For integer keys (like phone numbers)
             return key % self.size
@@ -47,10 +766,70 @@ class HashTable:
             else:
                 return hash(key) % self.size
                 
+    def _raw_hash(self, key):
+        """Hash of key before it is reduced to a slot index"""
+        if isinstance(key, str):
+            return self._string_hash(key, self.hash_seed)
+        elif isinstance(key, int):
+            return key
+        elif hasattr(key, 'tel_no'):
+            return key.tel_no
+        return hash(key)
+
+    def _cuckoo_buckets(self, key):
+        """The two candidate buckets of key for cuckoo hashing"""
+        buckets = self.size // self.CUCKOO_BUCKET_SIZE
+        raw = self._raw_hash(key)
+        first = raw % buckets
+        # Second hash with its own seed, changed on every rebuild. Names are
+        # hashed again from their bytes, so keys whose first hashes collide
+        # (e.g. anagrams under the "sum" strategy) still get separated
+        seed = 0x9e3779b97f4a7c15 * (self._rehash_seed + 1) ^ self.hash_seed
+        if isinstance(key, str):
+            second = _mix64(_fnv1a_hash(key, seed)) % buckets
+        else:
+            second = _mix64(raw + seed) % buckets
+        if second == first and buckets > 1:
+            second = (first + 1) % buckets
+        return first, second
+
+    def _swiss_hash(self, key):
+        """Home control group and 7-bit control fragment of key"""
+        mixed = _mix64(self._raw_hash(key))
+        return (mixed >> 7) % (self.size // _GROUP_WIDTH), mixed & 0x7F
+
+    def _swiss_find(self, group, fragment, key, field):
+        """Return (slot, comparisons) for key, slot None if it is absent"""
+        table = self.table
+        ctrl = self.ctrl
+        groups = self.size // _GROUP_WIDTH
+        pattern = _GROUP_LSB * fragment
+        comparisons = 0
+
+        for _ in range(groups):
+            base = group * _GROUP_WIDTH
+            word = int.from_bytes(ctrl[base:base + _GROUP_WIDTH], "little")
+            # Bytes equal to the fragment turn to zero; flag their high bits
+            x = word ^ pattern
+            matches = (x - _GROUP_LSB) & ~x & _GROUP_MSB
+            while matches:
+                low = matches & -matches
+                item = table[base + (low.bit_length() >> 3) - 1]
+                comparisons += 1
+                if getattr(item, field, item) == key:
+                    return base + (low.bit_length() >> 3) - 1, comparisons
+                matches ^= low
+            # Probes never pass a group that still has an empty slot
+            if word & ~(word << 6) & _GROUP_MSB:
+                break
+            group = (group + 1) % groups
+
+        return None, comparisons
+
     def secondary_hash(self, key):
         """Secondary hash function for double hashing"""
         if isinstance(key, str):
-            return 7 - (sum(ord(c) for c in key) % 7)
+            return 7 - (self._string_hash(key, self.hash_seed) % 7)
         elif isinstance(key, int):
             return 7 - (key % 7)
         else:
@@ -63,232 +842,746 @@ class HashTable:
         """Insert a key-value pair or just a key into the hash table"""
         # Create a record if both key and value are provided
         record = TelephoneRecord(key, value) if value is not None else key
-        index = self.hash_function(record if value is None else key)
-        
-        # Use the appropriate collision handling method
+        if self.key_type is not None and not isinstance(record, TelephoneRecord):
+            raise TypeError("Typed hash tables only store TelephoneRecords")
+        if self.read_only:
+            raise TypeError("Memory-mapped snapshot tables are read-only")
+
+        if self._old is not None:
+            self._rehash_some(self.rehash_step)
+        self._maybe_resize(self.count + 1)
+        # A record still waiting in the old table (possibly one the resize
+        # above just retired) is updated where it is
+        if self._old is not None and isinstance(record, TelephoneRecord):
+            found = self._old._find_slot(self._record_key(record))
+            if found is not None:
+                self._old._store(found, record)
+                return True
+
+        success = self._insert_record(record)
+        if not success and self.max_load_factor is not None:
+            # Probe sequence exhausted before the load limit: grow and retry
+            self._resize(_next_prime(self.size * 2))
+            success = self._insert_record(record)
+        self._check_stash()
+        return success
+
+    def _check_stash(self):
+        """Rebuild a cuckoo table whose stash overflowed, growing it if that does not help"""
+        if self.stash is None:
+            return
+        grow = self.count > 0.85 * self.size
+        while len(self.stash) > self.CUCKOO_STASH_SIZE and self._old is None:
+            # A fresh second hash usually breaks the eviction cycles; past
+            # 85% load, or when reseeding left the stash as full, there is
+            # simply not enough room
+            overflow = len(self.stash)
+            self._resize(_next_prime(self.size * 2) if grow else self.size)
+            grow = grow or len(self.stash) >= overflow
+
+    def _insert_record(self, record):
+        """Place a record using the appropriate collision handling method"""
+        if isinstance(record, TelephoneRecord):
+            field = self._record_field
+            key = getattr(record, field)
+        else:
+            # Bare keys are stored as they are, without an update check
+            field = None
+            key = record
+        index = self.hash_function(key)
+
         if self.method == "separate_chaining":
-            self._insert_chaining(index, record)
-            return True
+            return self._insert_chaining(index, record, key, field)
         elif self.method == "linear_probing":
-            return self._insert_linear_probing(index, record)
+            return self._insert_linear_probing(index, record, key, field)
         elif self.method == "quadratic_probing":
-            return self._insert_quadratic_probing(index, record)
+            return self._insert_quadratic_probing(index, record, key, field)
         elif self.method == "double_hashing":
-            return self._insert_double_hashing(index, record)
-    
-    def _insert_chaining(self, index, record):
+            return self._insert_double_hashing(index, record, key, field)
+        elif self.method == "robin_hood":
+            return self._insert_robin_hood(index, record, key, field)
+        elif self.method == "cuckoo":
+            return self._insert_cuckoo(index, record, key, field)
+        elif self.method == "swiss_table":
+            return self._insert_swiss_table(index, record, key, field)
+
+    def _record_key(self, record):
+        """Key a stored record is hashed by"""
+        return getattr(record, self._record_field, record)
+
+    @staticmethod
+    def _quadratic_probes(size):
+        """Return (a, probes): offsets grow by a*j + 1 for probes distinct slots"""
+        if size & (size - 1) == 0:
+            # Triangular offsets j(j+1)/2 visit every slot of a power-of-two table
+            return 1, size
+        elif _is_prime(size):
+            # Squares modulo a prime p reach exactly (p + 1) / 2 distinct slots
+            return 2, size // 2 + 1
+        return 2, size
+
+    def _probe_sequence(self, index, key):
+        """Yield the slots an open-addressing insert of key would visit"""
+        size = self.size
+        if self.method in ["linear_probing", "robin_hood"]:
+            for j in range(size):
+                yield (index + j) % size
+        elif self.method == "quadratic_probing":
+            a, probes = self._quadratic
+            for j in range(probes):
+                yield index
+                index = (index + a * j + 1) % size
+        elif self.method == "double_hashing":
+            second_hash = self.secondary_hash(key)
+            # The sequence cycles after size / gcd(step, size) distinct slots
+            for j in range(size // math.gcd(second_hash, size)):
+                yield index
+                index = (index + second_hash) % size
+
+    def _find_slot(self, key):
+        """Return (index, chain position) of the record matching key, or None"""
+        index = self.hash_function(key)
+        field = _key_field(key)
+        if self.method == "separate_chaining":
+            for position, item in enumerate(self.table[index]):
+                if getattr(item, field, item) == key:
+                    return index, position
+            return None
+        elif self.method == "cuckoo":
+            width = self.CUCKOO_BUCKET_SIZE
+            for bucket in self._cuckoo_buckets(key):
+                for slot in range(bucket * width, bucket * width + width):
+                    item = self.table[slot]
+                    if (item is not None and item is not _TOMBSTONE
+                            and getattr(item, field, item) == key):
+                        return slot, None
+            # Stash entries are reported as (None, position in the stash)
+            for position, item in enumerate(self.stash):
+                if getattr(item, field, item) == key:
+                    return None, position
+            return None
+        elif self.method == "swiss_table":
+            group, fragment = self._swiss_hash(key)
+            slot = self._swiss_find(group, fragment, key, field)[0]
+            return None if slot is None else (slot, None)
+
+        table = self.table
+        for probe_index in self._probe_sequence(index, key):
+            item = table[probe_index]
+            if item is None:
+                return None
+            if item is not _TOMBSTONE and getattr(item, field, item) == key:
+                return probe_index, None
+        return None
+
+    def _store(self, slot, record):
+        """Overwrite the record at a slot returned by _find_slot"""
+        index, position = slot
+        if self.method == "separate_chaining":
+            self.table[index][position] = record
+        elif index is None:
+            self.stash[position] = record
+        else:
+            self.table[index] = record
+
+    def _remove(self, slot):
+        """Remove the record at a slot returned by _find_slot"""
+        index, position = slot
+        if self.method == "separate_chaining":
+            del self.table[index][position]
+        elif self.method == "cuckoo":
+            # Lookups only visit fixed slots, so no tombstone is needed
+            if index is None:
+                del self.stash[position]
+            else:
+                self.table[index] = None
+        elif self.method == "swiss_table":
+            self.table[index] = None
+            base = index - index % _GROUP_WIDTH
+            word = int.from_bytes(self.ctrl[base:base + _GROUP_WIDTH], "little")
+            if word & ~(word << 6) & _GROUP_MSB:
+                # No probe ever went past a group with an empty slot
+                self.ctrl[index] = _CTRL_EMPTY
+            else:
+                self.ctrl[index] = _CTRL_DELETED
+                self.tombstones += 1
+        elif self.method == "robin_hood":
+            # Backward-shift deletion: pull the displaced records that follow
+            # one slot closer to home instead of leaving a tombstone
+            table = self.table
+            distances = self.distances
+            following = (index + 1) % self.size
+            while table[following] is not None and distances[following] > 0:
+                table[index] = table[following]
+                distances[index] = distances[following] - 1
+                index = following
+                following = (following + 1) % self.size
+            table[index] = None
+            distances[index] = -1
+        else:
+            # A tombstone keeps later records of the probe chain reachable
+            self.table[index] = _TOMBSTONE
+            self.tombstones += 1
+
+    def delete(self, key):
+        """Delete the record matching key; returns True if one was removed"""
+        if self.read_only:
+            raise TypeError("Memory-mapped snapshot tables are read-only")
+        if self._old is not None:
+            self._rehash_some(self.rehash_step)
+
+        slot = self._find_slot(key)
+        if slot is not None:
+            self._remove(slot)
+        else:
+            # The record may still be waiting in the old table
+            slot = self._old._find_slot(key) if self._old is not None else None
+            if slot is None:
+                return False
+            if self.method == "robin_hood":
+                # Shifting could move records behind the migration cursor
+                self._old._store(slot, _TOMBSTONE)
+            else:
+                self._old._remove(slot)
+
+        self.count -= 1
+        if self.tombstones > self.max_tombstone_ratio * self.size:
+            # Too many tombstones lengthen every probe: rebuild at the same size
+            self.compaction_count += 1
+            self._resize(self.size)
+        else:
+            self._maybe_resize(self.count)
+        return True
+
+    def _maybe_resize(self, count):
+        """Grow or shrink the table when count leaves the load factor band"""
+        if self.max_load_factor is not None and count > self.max_load_factor * self.size:
+            self._resize(_next_prime(self.size * 2))
+        elif (self.min_load_factor is not None and self.size > self.min_size
+              and count < self.min_load_factor * self.size):
+            new_size = _next_prime(max(self.min_size, self.size // 2))
+            if new_size < self.size:
+                self._resize(new_size)
+
+    def reserve(self, count, load_factor=0.5):
+        """Grow ahead of a bulk insert so count records fit at load_factor
+
+        Tables without a max_load_factor never grow on their own, and open
+        addressing ones refuse inserts once full.
+        """
+        if self.max_load_factor is not None:
+            load_factor = min(load_factor, self.max_load_factor)
+        if count > load_factor * self.size:
+            self._resize(_next_prime(int(count / load_factor) + 1))
+
+    def _resize(self, new_size):
+        """Move every record into a fresh table with new_size slots"""
+        self._finish_rehash()
+        start = time.perf_counter()
+        old = copy.copy(self)
+        self._rehash_seed += 1
+        self._allocate(new_size)
+        self.resize_count += 1
+        self._old = old
+        self._rehash_index = 0
+        self.rehash_seconds += time.perf_counter() - start
+        if not self.incremental_rehash:
+            self._finish_rehash()
+
+    def _rehash_some(self, steps):
+        """Migrate up to steps buckets of the old table into the current one"""
+        start = time.perf_counter()
+        old = self._old
+        end = min(self._rehash_index + steps, old.size)
+        moved = 0
+
+        for i in range(self._rehash_index, end):
+            if self.method == "separate_chaining":
+                for record in old.table[i]:
+                    self._insert_record(record)
+                    moved += 1
+                old.table[i] = []
+            else:
+                record = old.table[i]
+                if record is not None and record is not _TOMBSTONE:
+                    self._insert_record(record)
+                    moved += 1
+                    # Keep old probe chains intact for records not yet moved
+                    old.table[i] = _TOMBSTONE
+
+        if end == old.size and old.stash:
+            # Cuckoo stash entries live outside the slot array
+            for record in old.stash:
+                self._insert_record(record)
+                moved += 1
+            old.stash = []
+
+        # Migrated records were already counted when they were first inserted
+        self.count -= moved
+        self._rehash_index = end
+        if end == old.size:
+            self._old = None
+        self.rehash_seconds += time.perf_counter() - start
+
+    def _finish_rehash(self):
+        """Complete any incremental rehash that is still in progress"""
+        if self._old is not None:
+            self._rehash_some(self._old.size)
+
+    def _insert_chaining(self, index, record, key, field):
         """Insert using separate chaining"""
+        chain = self.table[index]
         # Check if key already exists (for TelephoneRecord objects)
-        if hasattr(record, 'name'):
-            for i, item in enumerate(self.table[index]):
-                if hasattr(item, 'name') and item.name == record.name:
-                    self.table[index][i] = record  # Update existing record
-                    return
+        if field is not None:
+            for i, item in enumerate(chain):
+                if getattr(item, field, None) == key:
+                    chain[i] = record  # Update existing record
+                    return True
         # If key doesn't exist or we're not checking, append to the chain
-        self.table[index].append(record)
+        chain.append(record)
+        self.count += 1
+        return True
     
-    def _insert_linear_probing(self, index, record):
+    def _insert_linear_probing(self, index, record, key, field):
         """Insert using linear probing"""
+        table = self.table
+        size = self.size
         original_index = index
+        free_index = None  # First tombstone seen, reused if the key is new
         
-        while self.table[index] is not None:
-            # If key exists, update the value (for TelephoneRecord objects)
-            if hasattr(record, 'name') and hasattr(self.table[index], 'name'):
-                if self.table[index].name == record.name:
-                    self.table[index] = record
-                    return True
+        item = table[index]
+        while item is not None:
+            if item is _TOMBSTONE:
+                if free_index is None:
+                    free_index = index
+            elif field is not None and getattr(item, field, None) == key:
+                # Key exists: update the value (for TelephoneRecord objects)
+                table[index] = record
+                return True
             
             # Linear probe to next position
-            index = (index + 1) % self.size
+            index = (index + 1) % size
             
             # If we've checked all positions, table is full
             if index == original_index:
+                if free_index is not None:
+                    break
                 print("Hash table is full!")
                 return False
+            item = table[index]
                 
-        self.table[index] = record
-        return True
+        return self._place(index, free_index, record)
     
-    def _insert_quadratic_probing(self, index, record):
+    def _insert_quadratic_probing(self, index, record, key, field):
         """Insert using quadratic probing"""
-        original_index = index
-        j = 1
+        table = self.table
+        size = self.size
+        a, probes = self._quadratic
+        free_index = None  # First tombstone seen, reused if the key is new
         
-        while self.table[index] is not None:
-            # If key exists, update the value (for TelephoneRecord objects)
-            if hasattr(record, 'name') and hasattr(self.table[index], 'name'):
-                if self.table[index].name == record.name:
-                    self.table[index] = record
-                    return True
+        for j in range(probes):
+            item = table[index]
+            if item is None:
+                break
+            if item is _TOMBSTONE:
+                if free_index is None:
+                    free_index = index
+            elif field is not None and getattr(item, field, None) == key:
+                # Key exists: update the value (for TelephoneRecord objects)
+                table[index] = record
+                return True
             
             # Quadratic probe to next position
-            index = (original_index + (j * j)) % self.size
-            j += 1
-            
-            # Prevent infinite loop
-            if j > self.size:
+            index = (index + a * j + 1) % size
+        else:
+            # Every slot the sequence can reach is taken
+            if free_index is None:
                 print("Hash table is full or cannot find an empty slot!")
                 return False
                 
-        self.table[index] = record
-        return True
+        return self._place(index, free_index, record)
     
-    def _insert_double_hashing(self, index, record):
+    def _insert_double_hashing(self, index, record, key, field):
         """Insert using double hashing"""
-        original_index = index
-        second_hash = self.secondary_hash(record if isinstance(record, (int, str)) else 
-                                         record.name if hasattr(record, 'name') else record.tel_no)
-        
-        j = 0
+        table = self.table
+        size = self.size
+        second_hash = self.secondary_hash(key)
+        free_index = None  # First tombstone seen, reused if the key is new
         
-        while self.table[index] is not None:
-            # If key exists, update the value (for TelephoneRecord objects)
-            if hasattr(record, 'name') and hasattr(self.table[index], 'name'):
-                if self.table[index].name == record.name:
-                    self.table[index] = record
-                    return True
+        # The sequence cycles after size / gcd(step, size) distinct slots
+        for _ in range(size // math.gcd(second_hash, size)):
+            item = table[index]
+            if item is None:
+                break
+            if item is _TOMBSTONE:
+                if free_index is None:
+                    free_index = index
+            elif field is not None and getattr(item, field, None) == key:
+                # Key exists: update the value (for TelephoneRecord objects)
+                table[index] = record
+                return True
             
             # Use double hashing formula
-            j += 1
-            index = (original_index + j * second_hash) % self.size
-            
-            # Prevent infinite loop
-            if j >= self.size:
+            index = (index + second_hash) % size
+        else:
+            # Every slot the sequence can reach is taken
+            if free_index is None:
                 print("Hash table is full or cannot find an empty slot!")
                 return False
                 
+        return self._place(index, free_index, record)
+
+    def _insert_robin_hood(self, index, record, key, field):
+        """Insert using robin hood hashing (linear probing that evens out distances)"""
+        table = self.table
+        distances = self.distances
+        size = self.size
+        full = self.count >= size
+        distance = 0
+
+        for _ in range(size):
+            item = table[index]
+            if item is None:
+                table[index] = record
+                distances[index] = distance
+                self.count += 1
+                return True
+            if field is not None and getattr(item, field, None) == key:
+                # Key exists: update the value (for TelephoneRecord objects)
+                table[index] = record
+                return True
+
+            if distances[index] < distance:
+                # The key would have been found by now, so it is new
+                if full:
+                    break
+                # Take the slot from the richer record and carry that one on
+                table[index], record = record, item
+                distances[index], distance = distance, distances[index]
+                field = None  # Displaced records are already unique
+
+            index = (index + 1) % size
+            distance += 1
+
+        print("Hash table is full!")
+        return False
+
+    def _insert_cuckoo(self, index, record, key, field):
+        """Insert using bucketized cuckoo hashing with a stash"""
+        table = self.table
+        stash = self.stash
+        width = self.CUCKOO_BUCKET_SIZE
+        first, second = self._cuckoo_buckets(key)
+
+        if field is not None:
+            # If key exists, update the value (for TelephoneRecord objects)
+            for bucket in (first, second):
+                for slot in range(bucket * width, bucket * width + width):
+                    item = table[slot]
+                    if item is not None and getattr(item, field, None) == key:
+                        table[slot] = record
+                        return True
+            for position, item in enumerate(stash):
+                if getattr(item, field, None) == key:
+                    stash[position] = record
+                    return True
+
+        self.count += 1
+        bucket = first
+        for kick in range(self.CUCKOO_MAX_KICKS):
+            # Take a free slot in a candidate bucket if there is one
+            for candidate in ((first, second) if kick == 0 else (bucket,)):
+                for slot in range(candidate * width, candidate * width + width):
+                    if table[slot] is None:
+                        table[slot] = record
+                        return True
+
+            # Evict a resident and send it to its other bucket
+            slot = bucket * width + kick % width
+            table[slot], record = record, table[slot]
+            first, second = self._cuckoo_buckets(self._record_key(record))
+            bucket = second if bucket == first else first
+
+        # Eviction cycle: park the homeless record; insert() rebuilds on overflow
+        stash.append(record)
+        return True
+
+    def _insert_swiss_table(self, index, record, key, field):
+        """Insert using swiss table control-byte groups"""
+        table = self.table
+        ctrl = self.ctrl
+        groups = self.size // _GROUP_WIDTH
+        group, fragment = self._swiss_hash(key)
+
+        if field is not None:
+            # If key exists, update the value (for TelephoneRecord objects)
+            slot = self._swiss_find(group, fragment, key, field)[0]
+            if slot is not None:
+                table[slot] = record
+                return True
+
+        for _ in range(groups):
+            base = group * _GROUP_WIDTH
+            # Empty and deleted control bytes both have the high bit set
+            free = int.from_bytes(ctrl[base:base + _GROUP_WIDTH], "little") & _GROUP_MSB
+            if free:
+                slot = base + ((free & -free).bit_length() >> 3) - 1
+                if ctrl[slot] == _CTRL_DELETED:
+                    self.tombstones -= 1
+                ctrl[slot] = fragment
+                table[slot] = record
+                self.count += 1
+                return True
+            group = (group + 1) % groups
+
+        print("Hash table is full!")
+        return False
+
+    def _place(self, index, free_index, record):
+        """Store a new record in the empty slot, preferring an earlier tombstone"""
+        if free_index is not None:
+            index = free_index
+            self.tombstones -= 1
         self.table[index] = record
+        self.count += 1
         return True
     
     def search(self, key):
         """Search for a key in the hash table and return the record"""
-        self.comparison_count = 0  # Reset comparison counter
+        if self._old is not None:
+            self._rehash_some(self.rehash_step)
+        record, comparisons = self._lookup(key)
+        self.comparison_count = comparisons
+        return record, comparisons
+
+    def _lookup(self, key):
+        """Find key without changing the table; returns (record, comparisons)"""
         index = self.hash_function(key)
+        # Decide once per call which record attribute the key is compared with
+        field = _key_field(key)
         
         if self.method == "separate_chaining":
-            return self._search_chaining(index, key)
+            record, comparisons = self._search_chaining(index, key, field)
         elif self.method == "linear_probing":
-            return self._search_linear_probing(index, key)
+            record, comparisons = self._search_linear_probing(index, key, field)
         elif self.method == "quadratic_probing":
-            return self._search_quadratic_probing(index, key)
+            record, comparisons = self._search_quadratic_probing(index, key, field)
         elif self.method == "double_hashing":
-            return self._search_double_hashing(index, key)
+            record, comparisons = self._search_double_hashing(index, key, field)
+        elif self.method == "robin_hood":
+            record, comparisons = self._search_robin_hood(index, key, field)
+        elif self.method == "cuckoo":
+            record, comparisons = self._search_cuckoo(index, key, field)
+        elif self.method == "swiss_table":
+            record, comparisons = self._search_swiss_table(index, key, field)
+
+        if record is None and self._old is not None:
+            # Not migrated yet: fall back to the old table
+            record, old_comparisons = self._old._lookup(key)
+            comparisons += old_comparisons
+        return record, comparisons
+
+    def search_many(self, keys):
+        """Look up a batch of keys; returns a list of records (None if missing)
+
+        Unlike search() this finishes any pending rehash up front, skips the
+        per-call bookkeeping and resolves each key with the search routine
+        picked once for the whole batch. With NumPy installed, a compact
+        table keyed by number first resolves every int64 key sitting in its
+        home slot (or at the head of its chain) with vectorized gathers;
+        names and larger numbers take the scalar path.
+        """
+        self._finish_rehash()
+        keys = keys.tolist() if hasattr(keys, "tolist") else list(keys)
+        results = [None] * len(keys)
+        pending = range(len(keys))
+
+        if (np is not None and self.storage == "compact" and self.key_type == "number"
+                and self.method not in ("cuckoo", "swiss_table") and keys):
+            numeric = [position for position, key in enumerate(keys)
+                       if type(key) is int and -2**63 <= key < 2**63]
+            if numeric:
+                numeric = np.asarray(numeric, dtype=np.int64)
+                numbers = np.asarray([keys[position] for position in numeric.tolist()],
+                                     dtype=np.int64)
+                positions, entries = self._home_hits(numbers)
+                read = self.table._read
+                for position, entry in zip(numeric[positions].tolist(), entries.tolist()):
+                    results[position] = read(entry)
+                missed = np.ones(len(keys), dtype=bool)
+                missed[numeric[positions]] = False
+                pending = np.flatnonzero(missed).tolist()
+
+        search = {
+            "separate_chaining": self._search_chaining,
+            "linear_probing": self._search_linear_probing,
+            "quadratic_probing": self._search_quadratic_probing,
+            "double_hashing": self._search_double_hashing,
+            "robin_hood": self._search_robin_hood,
+            "cuckoo": self._search_cuckoo,
+            "swiss_table": self._search_swiss_table,
+        }[self.method]
+        hash_function = self.hash_function
+        for position in pending:
+            key = keys[position]
+            results[position] = search(hash_function(key), key, _key_field(key))[0]
+        return results
+
+    def _home_hits(self, numbers):
+        """Vectorized first probe: (positions, entries) of numbers found at once"""
+        homes = numbers % self.size
+        if self.method == "separate_chaining":
+            entries = np.frombuffer(self.table.heads, dtype=np.int64)[homes]
+            present = entries >= 0
+        else:
+            entries = homes
+            lengths = np.frombuffer(self.table.name_lengths, dtype=np.int32)[homes]
+            present = (lengths >= 0) | (lengths == _NUMBER_ENTRY)
+        if not present.any():
+            return np.flatnonzero(present), entries[present]
+        stored = np.frombuffer(self.table.numbers, dtype=np.int64)
+        found = present & (stored[np.where(present, entries, 0)] == numbers)
+        positions = np.flatnonzero(found)
+        return positions, entries[positions]
             
-    def _search_chaining(self, index, key):
+    def _search_chaining(self, index, key, field):
         """Search using separate chaining"""
+        comparisons = 0
         # Search through the chain at the hashed index
         for item in self.table[index]:
-            self.comparison_count += 1
-            
-            # Check if we found our item
-            if isinstance(key, str) and hasattr(item, 'name') and item.name == key:
-                return item, self.comparison_count
-            elif isinstance(key, int) and hasattr(item, 'tel_no') and item.tel_no == key:
-                return item, self.comparison_count
-            elif item == key:  # Direct comparison for other types
-                return item, self.comparison_count
+            comparisons += 1
+            if getattr(item, field, item) == key:
+                return item, comparisons
                 
-        return None, self.comparison_count
+        return None, comparisons
         
-    def _search_linear_probing(self, index, key):
+    def _search_linear_probing(self, index, key, field):
         """Search using linear probing"""
+        table = self.table
+        size = self.size
         original_index = index
+        comparisons = 0
         
-        while self.table[index] is not None:
-            self.comparison_count += 1
-            
-            # Check if we found our item
-            if isinstance(key, str) and hasattr(self.table[index], 'name') and self.table[index].name == key:
-                return self.table[index], self.comparison_count
-            elif isinstance(key, int) and hasattr(self.table[index], 'tel_no') and self.table[index].tel_no == key:
-                return self.table[index], self.comparison_count
-            elif self.table[index] == key:  # Direct comparison
-                return self.table[index], self.comparison_count
+        item = table[index]
+        while item is not None:
+            # Deleted slots keep the probe chain going without a comparison
+            if item is not _TOMBSTONE:
+                comparisons += 1
+                if getattr(item, field, item) == key:
+                    return item, comparisons
                 
             # Linear probe to next position
-            index = (index + 1) % self.size
+            index = (index + 1) % size
             
             # If we've checked all positions, item not found
             if index == original_index:
                 break
+            item = table[index]
                 
-        return None, self.comparison_count
+        return None, comparisons
         
-    def _search_quadratic_probing(self, index, key):
+    def _search_quadratic_probing(self, index, key, field):
         """Search using quadratic probing"""
-        original_index = index
-        j = 0
-        checked_positions = set()
+        table = self.table
+        size = self.size
+        a, probes = self._quadratic
+        comparisons = 0
         
-        while True:
-            # Calculate position using quadratic probing
-            probe_index = (original_index + (j * j)) % self.size
-            
-            # If we've already checked this position or checked too many positions
-            if probe_index in checked_positions or len(checked_positions) >= self.size:
+        # The sequence is bounded, so no record of visited slots is needed
+        for j in range(probes):
+            item = table[index]
+            # An empty slot ends the probe chain: the key is not in the table
+            if item is None:
                 break
-                
-            checked_positions.add(probe_index)
-            
-            # If position is empty, item not found
-            if self.table[probe_index] is None:
-                j += 1
-                continue
-                
-            self.comparison_count += 1
+            # Deleted slots keep the probe chain going without a comparison
+            if item is not _TOMBSTONE:
+                comparisons += 1
+                if getattr(item, field, item) == key:
+                    return item, comparisons
             
-            # Check if we found our item
-            if isinstance(key, str) and hasattr(self.table[probe_index], 'name') and self.table[probe_index].name == key:
-                return self.table[probe_index], self.comparison_count
-            elif isinstance(key, int) and hasattr(self.table[probe_index], 'tel_no') and self.table[probe_index].tel_no == key:
-                return self.table[probe_index], self.comparison_count
-            elif self.table[probe_index] == key:  # Direct comparison
-                return self.table[probe_index], self.comparison_count
-                
-            j += 1
+            # Quadratic probe to next position
+            index = (index + a * j + 1) % size
             
-        return None, self.comparison_count
+        return None, comparisons
         
-    def _search_double_hashing(self, index, key):
+    def _search_double_hashing(self, index, key, field):
         """Search using double hashing"""
-        original_index = index
+        table = self.table
+        size = self.size
         second_hash = self.secondary_hash(key)
-        j = 0
+        comparisons = 0
         
-        # Keep track of positions we've checked to avoid infinite loop
-        checked_positions = set()
-        
-        while True:
-            # Calculate position using double hashing
-            probe_index = (original_index + j * second_hash) % self.size
-            
-            # If we've already checked this position or checked too many positions
-            if probe_index in checked_positions or len(checked_positions) >= self.size:
+        # The sequence cycles after size / gcd(step, size) distinct slots
+        for _ in range(size // math.gcd(second_hash, size)):
+            item = table[index]
+            # An empty slot ends the probe chain: the key is not in the table
+            if item is None:
                 break
-                
-            checked_positions.add(probe_index)
+            # Deleted slots keep the probe chain going without a comparison
+            if item is not _TOMBSTONE:
+                comparisons += 1
+                if getattr(item, field, item) == key:
+                    return item, comparisons
             
-            # If position is empty, item not found
-            if self.table[probe_index] is None:
-                j += 1
-                continue
-                
-            self.comparison_count += 1
-            
-            # Check if we found our item
-            if isinstance(key, str) and hasattr(self.table[probe_index], 'name') and self.table[probe_index].name == key:
-                return self.table[probe_index], self.comparison_count
-            elif isinstance(key, int) and hasattr(self.table[probe_index], 'tel_no') and self.table[probe_index].tel_no == key:
-                return self.table[probe_index], self.comparison_count
-            elif self.table[probe_index] == key:  # Direct comparison
-                return self.table[probe_index], self.comparison_count
-                
-            j += 1
+            # Use double hashing formula
+            index = (index + second_hash) % size
             
-        return None, self.comparison_count
+        return None, comparisons
     
+    def _search_robin_hood(self, index, key, field):
+        """Search using robin hood hashing"""
+        table = self.table
+        distances = self.distances
+        size = self.size
+        comparisons = 0
+        distance = 0
+
+        for _ in range(size):
+            item = table[index]
+            # A slot closer to its home than we are to ours ends the search:
+            # the key would have displaced that record on insert
+            if item is None or distances[index] < distance:
+                break
+            if item is not _TOMBSTONE:
+                comparisons += 1
+                if getattr(item, field, item) == key:
+                    return item, comparisons
+
+            index = (index + 1) % size
+            distance += 1
+
+        return None, comparisons
+
+    def _search_cuckoo(self, index, key, field):
+        """Search using cuckoo hashing: two buckets and the stash at most"""
+        table = self.table
+        width = self.CUCKOO_BUCKET_SIZE
+        comparisons = 0
+
+        for bucket in self._cuckoo_buckets(key):
+            for slot in range(bucket * width, bucket * width + width):
+                item = table[slot]
+                if item is not None and item is not _TOMBSTONE:
+                    comparisons += 1
+                    if getattr(item, field, item) == key:
+                        return item, comparisons
+
+        for item in self.stash:
+            comparisons += 1
+            if getattr(item, field, item) == key:
+                return item, comparisons
+
+        return None, comparisons
+
+    def _search_swiss_table(self, index, key, field):
+        """Search using swiss table control-byte groups"""
+        group, fragment = self._swiss_hash(key)
+        slot, comparisons = self._swiss_find(group, fragment, key, field)
+        return (None if slot is None else self.table[slot]), comparisons
+
     def display(self):
         """Display all entries in the hash table"""
+        self._finish_rehash()
         print("\n" + "="*50)
         print(f"HASH TABLE ({self.method})")
         print("="*50)
@@ -309,12 +1602,19 @@ class HashTable:
             else:  # For probing methods
                 if self.table[i] is None:
                     print(f"{i}\t-")
+                elif self.method == "robin_hood":
+                    print(f"{i}\t{self.table[i]} (distance {self.distances[i]})")
+                elif self.method == "swiss_table":
+                    print(f"{i}\t{self.table[i]} (control {self.ctrl[i]:#04x})")
                 else:
                     print(f"{i}\t{self.table[i]}")
+        if self.stash:
+            print(f"Stash\t{', '.join(str(item) for item in self.stash)}")
         print("="*50)
     
     def stats(self):
         """Display statistics about the hash table"""
+        self._finish_rehash()
         count = 0
         empty = 0
         
@@ -334,13 +1634,16 @@ class HashTable:
             print(f"Empty buckets: {empty} ({empty/self.size*100:.1f}%)")
             print(f"Average chain length: {sum(chains)/self.size:.2f}")
             print(f"Max chain length: {max(chains)}")
+            self._print_resize_stats()
             print("="*50)
         else:
             for i in range(self.size):
-                if self.table[i] is not None:
+                if self.table[i] is not None and self.table[i] is not _TOMBSTONE:
                     count += 1
                 else:
                     empty += 1
+            if self.stash is not None:
+                count += len(self.stash)
             
             print("\n" + "="*50)
             print(f"HASH TABLE STATISTICS ({self.method})")
@@ -348,39 +1651,1295 @@ class HashTable:
             print(f"Total entries: {count}")
             print(f"Empty slots: {empty} ({empty/self.size*100:.1f}%)")
             print(f"Load factor: {count/self.size:.2f}")
+            print(f"Tombstones: {self.tombstones} (compactions: {self.compaction_count})")
+            if self.stash is not None:
+                print(f"Stash: {len(self.stash)} of {self.CUCKOO_STASH_SIZE}")
+            if self.ctrl is not None:
+                print(f"Control groups: {self.size // _GROUP_WIDTH} x {_GROUP_WIDTH} slots")
+            clusters = self.cluster_lengths()
+            if clusters:
+                runs = sum(clusters.values())
+                total = sum(length * count for length, count in clusters.items())
+                print(f"Clusters: {runs}, avg length {total / runs:.2f}, max {max(clusters)}")
+            probes = self.probe_lengths()
+            if probes:
+                mean = sum(probes) / len(probes)
+                variance = sum((p - mean) ** 2 for p in probes) / len(probes)
+                print(f"Probe length: avg {mean:.2f}, variance {variance:.2f}, max {max(probes)}")
+            self._print_resize_stats()
             print("="*50)
 
+    def probe_lengths(self):
+        """Comparisons needed to find each stored record
+
+        Goes through _lookup, so it is not counted by metrics() and does not
+        advance an incremental rehash.
+        """
+        tables = [self] if self._old is None else [self, self._old]
+        return [self._lookup(self._record_key(record))[1]
+                for table in tables for record in table._stored_records()]
+
+    def memory_usage(self):
+        """Approximate bytes held by the slot array and the stored records"""
+        self._finish_rehash()
+        total = sys.getsizeof(self.table)
+        if self.distances is not None:
+            total += sys.getsizeof(self.distances)
+        if self.ctrl is not None:
+            total += sys.getsizeof(self.ctrl)
+        if self.storage == "compact":
+            return total + self.table.nbytes()
+
+        if self.method == "separate_chaining":
+            total += sum(sys.getsizeof(chain) for chain in self.table)
+        for record in self.records():
+            total += sys.getsizeof(record)
+            if isinstance(record, TelephoneRecord):
+                total += sys.getsizeof(record.name) + sys.getsizeof(record.tel_no)
+        return total
+
+    def enable_metrics(self):
+        """Record probe-length histograms and operation counts from now on
+
+        search, insert and delete are swapped for recording wrappers on
+        this instance only, so a table without metrics pays nothing.
+        Insert probe lengths are measured by looking the record up again.
+        """
+        if self._histograms is None:
+            self._histograms = {kind: array('q', [0]) * (_HISTOGRAM_BUCKETS + 1)
+                                for kind in ("search_hit", "search_miss", "insert")}
+            self._operations = {"search": 0, "insert": 0, "delete": 0}
+        self.search = self._metered_search
+        self.insert = self._metered_insert
+        self.delete = self._metered_delete
+
+    def disable_metrics(self):
+        """Stop recording; what was recorded stays available in metrics()"""
+        for name in ("search", "insert", "delete"):
+            self.__dict__.pop(name, None)
+
+    def _metered_search(self, key):
+        record, comparisons = type(self).search(self, key)
+        self._operations["search"] += 1
+        kind = "search_hit" if record is not None else "search_miss"
+        self._histograms[kind][min(comparisons, _HISTOGRAM_BUCKETS)] += 1
+        return record, comparisons
+
+    def _metered_insert(self, key, value=None):
+        success = type(self).insert(self, key, value)
+        self._operations["insert"] += 1
+        if success:
+            record = TelephoneRecord(key, value) if value is not None else key
+            probes = self._lookup(self._record_key(record))[1]
+            self._histograms["insert"][min(probes, _HISTOGRAM_BUCKETS)] += 1
+        return success
+
+    def _metered_delete(self, key):
+        success = type(self).delete(self, key)
+        self._operations["delete"] += 1
+        return success
+
+    def cluster_lengths(self):
+        """Histogram {run length: count} of runs of occupied slots
+
+        Tombstones count as occupied since probes walk through them. For
+        separate chaining this is the chain length distribution instead.
+        During an incremental rehash the retired table, which lookups still
+        probe, is counted too; nothing is migrated.
+        """
+        clusters = {}
+        for table in ([self] if self._old is None else [self, self._old]):
+            table._count_clusters(clusters)
+        return clusters
+
+    def _count_clusters(self, clusters):
+        """Add the runs (or chains) of this table's own slots to clusters"""
+        if self.method == "separate_chaining":
+            for chain in self.table:
+                length = len(chain)
+                if length:
+                    clusters[length] = clusters.get(length, 0) + 1
+            return
+
+        occupied = [item is not None for item in self.table]
+        if all(occupied):
+            clusters[self.size] = clusters.get(self.size, 0) + 1
+            return
+        # Start just after an empty slot so no run wraps around the end
+        start = occupied.index(False) + 1
+        run = 0
+        for i in range(start, start + self.size):
+            if occupied[i % self.size]:
+                run += 1
+            elif run:
+                clusters[run] = clusters.get(run, 0) + 1
+                run = 0
+        if run:
+            clusters[run] = clusters.get(run, 0) + 1
+
+    def metrics(self):
+        """Structured snapshot of the table's counters and distributions"""
+        histograms = {}
+        if self._histograms is not None:
+            for kind, counts in self._histograms.items():
+                histograms[kind] = {length: count for length, count in enumerate(counts) if count}
+        return {
+            "method": self.method,
+            "size": self.size,
+            "count": self.count,
+            "load_factor": self.count / self.size,
+            "tombstones": self.tombstones,
+            "resizes": self.resize_count,
+            "compactions": self.compaction_count,
+            "rehash_seconds": self.rehash_seconds,
+            "rehash_in_progress": self._old is not None,
+            "metrics_enabled": "search" in self.__dict__,
+            "operations": dict(self._operations or {}),
+            "probe_lengths": histograms,
+            "cluster_lengths": self.cluster_lengths(),
+        }
+
+    def prometheus_metrics(self, prefix="hashtable"):
+        """metrics() in the Prometheus text exposition format"""
+        data = self.metrics()
+        label = f'method="{self.method}"'
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{prefix}_{name}{suffix}{{{labels}}} {value}")
+
+        metric("entries", "gauge", "Records stored", [("", label, data["count"])])
+        metric("capacity", "gauge", "Slots or buckets allocated", [("", label, data["size"])])
+        metric("load_factor", "gauge", "Entries per slot", [("", label, data["load_factor"])])
+        metric("tombstones", "gauge", "Deleted-slot markers", [("", label, data["tombstones"])])
+        metric("resizes_total", "counter", "Table rebuilds", [("", label, data["resizes"])])
+        metric("compactions_total", "counter", "Rebuilds to clear tombstones",
+               [("", label, data["compactions"])])
+        metric("rehash_seconds_total", "counter", "Time spent resizing and migrating",
+               [("", label, data["rehash_seconds"])])
+        metric("operations_total", "counter", "Operations recorded while metrics were on",
+               [("", f'{label},operation="{operation}"', count)
+                for operation, count in data["operations"].items()])
+
+        samples = []
+        for kind, counts in data["probe_lengths"].items():
+            labels = f'{label},kind="{kind}"'
+            for bound in _PROMETHEUS_BUCKETS:
+                cumulative = sum(count for length, count in counts.items() if length <= bound)
+                samples.append(("_bucket", f'{labels},le="{bound}"', cumulative))
+            samples.append(("_bucket", f'{labels},le="+Inf"', sum(counts.values())))
+            samples.append(("_sum", labels, sum(length * count for length, count in counts.items())))
+            samples.append(("_count", labels, sum(counts.values())))
+        if samples:
+            metric("probe_length", "histogram", "Comparisons per operation", samples)
+        return "\n".join(lines) + "\n"
+
+    def _print_resize_stats(self):
+        """Print capacity details when automatic resizing is enabled"""
+        if self.max_load_factor is None and self.min_load_factor is None:
+            return
+        print(f"Capacity: {self.size} (initial {self.min_size})")
+        print(f"Rehashes: {self.resize_count} ({self.rehash_seconds * 1000:.1f} ms)")
+
+
+class ConcurrentHashTable(HashTable):
+    """HashTable that can be shared between threads
+
+    Writers serialize on one lock. Readers take no lock at all: a lookup
+    is checked against seqlock counters (odd while a write is under way)
+    and retried if a writer got in the way. The slots are striped into
+    bucket ranges with a counter each, so an insert or delete confined to
+    one separate-chaining bucket only disturbs readers of that stripe.
+    Resizes, migrations and open-addressing writes, whose probes and
+    displacements cross stripes, bump the table-wide counter instead.
+
+    search() returns the comparisons of that call and never stores them.
+    """
+
+    def __init__(self, size=100, method="separate_chaining", stripes=16, **options):
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        self.stripes = stripes
+        self._write_lock = threading.RLock()
+        self._writing = False
+        self._epoch = 0
+        self._stripe_sequences = [0] * stripes
+        super().__init__(size, method, **options)
+
+    def _stripe(self, key):
+        """Bucket range holding the home bucket of key"""
+        return self.hash_function(key) * self.stripes // self.size
+
+    def _stripe_local(self, delta):
+        """True if changing count by delta can only touch one chaining bucket"""
+        if (self.method != "separate_chaining" or self.storage != "objects"
+                or self._old is not None):
+            return False
+        count = self.count + delta
+        if self.max_load_factor is not None and count > self.max_load_factor * self.size:
+            return False
+        if self.min_load_factor is not None and count < self.min_load_factor * self.size:
+            return False
+        return True
+
+    @contextmanager
+    def _writer(self, stripe=None):
+        """Hold the write lock with the stripe's (or the whole table's) counter odd"""
+        with self._write_lock:
+            if self._writing:
+                # Nested in a write that already holds the counters odd
+                yield
+                return
+            self._writing = True
+            if stripe is None:
+                self._epoch += 1
+            else:
+                self._stripe_sequences[stripe] += 1
+            try:
+                yield
+            finally:
+                if stripe is None:
+                    self._epoch += 1
+                else:
+                    self._stripe_sequences[stripe] += 1
+                self._writing = False
+
+    def search(self, key):
+        """Search without locking; returns (record, comparisons) for this call"""
+        while True:
+            epoch = self._epoch
+            stripe = sequence = None
+            try:
+                stripe = self._stripe(key)
+                sequence = self._stripe_sequences[stripe]
+                if not (epoch | sequence) & 1:
+                    result = self._lookup(key)
+                    if self._epoch == epoch and self._stripe_sequences[stripe] == sequence:
+                        return result
+            except (IndexError, AttributeError, TypeError):
+                # A torn read of a table being rebuilt is tried again; the
+                # same error while no writer got in the way is the caller's
+                if (not epoch & 1 and self._epoch == epoch
+                        and (sequence is None or self._stripe_sequences[stripe] == sequence)):
+                    raise
+            # Let the writer finish before retrying
+            time.sleep(0)
+
+    def search_many(self, keys):
+        """Batch lookup, holding off writers for the duration"""
+        with self._write_lock:
+            return super().search_many(keys)
+
+    def insert(self, key, value=None):
+        """Thread-safe insert"""
+        with self._write_lock:
+            stripe = None
+            if self._stripe_local(1):
+                record = TelephoneRecord(key, value) if value is not None else key
+                stripe = self._stripe(self._record_key(record))
+            with self._writer(stripe):
+                return super().insert(key, value)
+
+    def delete(self, key):
+        """Thread-safe delete"""
+        with self._write_lock:
+            stripe = self._stripe(key) if self._stripe_local(-1) else None
+            with self._writer(stripe):
+                return super().delete(key)
+
+    def reserve(self, count, load_factor=0.5):
+        """Thread-safe reserve"""
+        with self._write_lock, self._writer():
+            super().reserve(count, load_factor)
+
+    def _finish_rehash(self):
+        if self._old is not None:
+            with self._writer():
+                super()._finish_rehash()
+
+
+# Write-ahead log records: crc32, operation, name length, tel_no, then the name
+_WAL_RECORD = struct.Struct("<IBIq")
+_WAL_INSERT = 1
+_WAL_DELETE = 2
+
+
+class WriteAheadLog:
+    """Append-only binary log of directory mutations with group commit
+
+    Records are buffered and written with one fsync per group: a group is
+    committed once group_size records are pending, or by a timer thread
+    group_delay seconds after its first record was appended, so a quiet
+    directory does not hold records in memory indefinitely. group_size=1 makes every operation durable before it returns; larger
+    groups trade the last few operations before a crash for throughput.
+    fsync=False leaves durability to the OS page cache.
+    """
+
+    def __init__(self, path, group_size=1, group_delay=0.0, fsync=True):
+        if group_size < 1:
+            raise ValueError("group_size must be at least 1")
+        self.path = path
+        self.group_size = group_size
+        self.group_delay = group_delay
+        self.fsync = fsync
+        self.commits = 0
+        self._pending = []
+        # The group_delay timer commits from its own thread
+        self._lock = threading.RLock()
+        self._timer = None
+        # Drop a torn record left by a crash in the middle of a write
+        valid_end = self._scan(path)[1]
+        self._file = open(path, "ab")
+        if self._file.tell() > valid_end:
+            self._file.truncate(valid_end)
+
+    @staticmethod
+    def _scan(path):
+        """Return (records, end offset of the last intact record) for a log file"""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return [], 0
+        records = []
+        offset = 0
+        while offset + _WAL_RECORD.size <= len(data):
+            crc, operation, length, tel_no = _WAL_RECORD.unpack_from(data, offset)
+            end = offset + _WAL_RECORD.size + length
+            if end > len(data) or zlib.crc32(data[offset + 4:end]) != crc:
+                break
+            name = data[offset + _WAL_RECORD.size:end].decode("utf-8")
+            records.append((operation, name, tel_no))
+            offset = end
+        return records, offset
+
+    @classmethod
+    def replay(cls, path):
+        """Return the (operation, name, tel_no) records intact in the log"""
+        return cls._scan(path)[0]
+
+    def append(self, operation, name, tel_no=0):
+        """Buffer one record, committing the group when it is full or old"""
+        encoded = name.encode("utf-8")
+        body = _WAL_RECORD.pack(0, operation, len(encoded), tel_no)[4:] + encoded
+        with self._lock:
+            self._pending.append(struct.pack("<I", zlib.crc32(body)) + body)
+            if len(self._pending) >= self.group_size:
+                self.commit()
+            elif self._timer is None and self.group_delay > 0:
+                self._timer = threading.Timer(self.group_delay, self._commit_late)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _commit_late(self):
+        """Timer callback: commit a group that did not fill up within group_delay"""
+        with self._lock:
+            if self._timer is threading.current_thread():
+                self.commit()
+
+    def commit(self):
+        """Write and fsync every pending record"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending or self._file.closed:
+                return
+            self._file.write(b"".join(self._pending))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.commits += 1
+            self._pending = []
+
+    def truncate(self):
+        """Empty the log once its records are covered by a checkpoint"""
+        with self._lock:
+            self.commit()
+            self._file.truncate(0)
+            self._file.seek(0)
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        """Commit what is pending and close the file"""
+        with self._lock:
+            if not self._file.closed:
+                self.commit()
+                self._file.close()
+
+
+class _AdaptiveState:
+    """Traffic sample and pending evaluation of TelephoneDirectory.enable_adaptive()"""
+
+    def __init__(self, evaluate_every, sample_size, candidates, min_gain, probe_target,
+                 background, confirmations, cooldown):
+        self.evaluate_every = evaluate_every
+        self.candidates = candidates
+        self.min_gain = min_gain
+        self.probe_target = probe_target
+        self.background = background
+        self.confirmations = confirmations
+        self.cooldown = cooldown
+        self.decisions = []
+        # Method that won the latest evaluations, how many in a row, and
+        # when the directory last switched (time.monotonic())
+        self.leader = None
+        self.wins = 0
+        self.last_switch = None
+        self._reset_window(sample_size)
+        # Background evaluation: its result, the writes it has to catch up
+        # on, and whether a rebuild made it worthless
+        self.job = None
+        self.result = None
+        self.pending = []
+        self.stale = False
+
+    def _reset_window(self, sample_size=None):
+        self.lookups = 0
+        self.hits = 0
+        self.number_lookups = 0
+        self.comparisons = 0
+        self.probed = 0
+        self.keys = deque(maxlen=sample_size or self.keys.maxlen)
+
+
+_NOT_CACHED = object()
+
+
+class LookupCache:
+    """Bounded cache of lookup results in front of a TelephoneDirectory
+
+    Keys are names or numbers; values are records, or None for a cached
+    miss when negative caching is on. Entries are kept in LRU order. With
+    the "tinylfu" policy a new key only replaces the LRU victim if a
+    count-min sketch of recent accesses has seen it more often, so one-off
+    lookups cannot flush the hot set.
+    """
+
+    POLICIES = ("lru", "tinylfu")
+    SKETCH_ROWS = 4
+    SKETCH_MAX = 15  # 4-bit counters, as in TinyLFU
+
+    def __init__(self, capacity=4096, policy="lru", negative=True):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Invalid cache policy: {policy}")
+        if capacity < 1:
+            raise ValueError("Cache capacity must be at least 1")
+        self.capacity = capacity
+        self.policy = policy
+        self.negative = negative
+        self.entries = OrderedDict()
+        # Sketch rows index with 16-bit slices of one 64-bit hash
+        self.width = min(1 << 16, 1 << max(4 * capacity - 1, 1).bit_length())
+        self.sketch = array('B', bytes(self.SKETCH_ROWS * self.width))
+        self.sample_size = 10 * capacity
+        self.additions = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _sketch_slots(self, key):
+        """Counter positions of key, one per sketch row"""
+        h = _mix64(hash(key))
+        width = self.width
+        mask = width - 1
+        return (h & mask, width + ((h >> 16) & mask),
+                2 * width + ((h >> 32) & mask), 3 * width + ((h >> 48) & mask))
+
+    def _record_access(self, key):
+        """Count an access in the sketch, halving every counter each sample_size accesses"""
+        sketch = self.sketch
+        for slot in self._sketch_slots(key):
+            if sketch[slot] < self.SKETCH_MAX:
+                sketch[slot] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.sketch = array('B', (count >> 1 for count in sketch))
+            self.additions //= 2
+
+    def frequency(self, key):
+        """Estimated recent access count of key"""
+        sketch = self.sketch
+        a, b, c, d = self._sketch_slots(key)
+        return min(sketch[a], sketch[b], sketch[c], sketch[d])
+
+    def get(self, key):
+        """Cached record (None for a cached miss), or _NOT_CACHED"""
+        if self.policy == "tinylfu":
+            self._record_access(key)
+        record = self.entries.get(key, _NOT_CACHED)
+        if record is _NOT_CACHED:
+            self.misses += 1
+        else:
+            self.entries.move_to_end(key)
+            if record is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+        return record
+
+    def put(self, key, record):
+        """Cache the result of a lookup that missed the cache"""
+        if record is None and not self.negative:
+            return
+        entries = self.entries
+        if key in entries:
+            entries[key] = record
+            entries.move_to_end(key)
+            return
+        if len(entries) >= self.capacity:
+            victim = next(iter(entries))
+            if self.policy == "tinylfu" and self.frequency(key) <= self.frequency(victim):
+                self.rejections += 1
+                return
+            del entries[victim]
+            self.evictions += 1
+        entries[key] = record
+
+    def invalidate(self, *keys):
+        """Forget the cached results for keys"""
+        for key in keys:
+            if self.entries.pop(key, _NOT_CACHED) is not _NOT_CACHED:
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry; the counters and the sketch are kept"""
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+
+    def hit_ratio(self):
+        """Share of lookups answered from the cache, cached misses included"""
+        lookups = self.hits + self.negative_hits + self.misses
+        return (self.hits + self.negative_hits) / lookups if lookups else 0.0
+
+    def metrics(self):
+        """Counters as a dict"""
+        return {
+            "policy": self.policy,
+            "capacity": self.capacity,
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio(),
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+            "invalidations": self.invalidations,
+        }
+
+    def stats(self):
+        """Print the cache counters"""
+        print("\n" + "="*50)
+        print(f"LOOKUP CACHE ({self.policy}, {len(self.entries)}/{self.capacity} entries)")
+        print("="*50)
+        print(f"Hits: {self.hits} (+{self.negative_hits} cached misses)")
+        print(f"Misses: {self.misses}")
+        print(f"Hit ratio: {self.hit_ratio():.1%}")
+        print(f"Evictions: {self.evictions}")
+        if self.policy == "tinylfu":
+            print(f"Admissions rejected: {self.rejections}")
+        print(f"Invalidations: {self.invalidations}")
+        print("="*50)
+
+
+class PrefixIndex:
+    """Case-insensitive prefix search over names, kept as a sorted array
+
+    keys holds the casefolded names in order and names the originals at
+    the same positions, so a prefix is two binary searches and a slice.
+    """
+
+    def __init__(self, names=()):
+        pairs = sorted((name.casefold(), name) for name in names)
+        self.keys = [key for key, _ in pairs]
+        self.names = [name for _, name in pairs]
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        """Insert name in order"""
+        key = name.casefold()
+        i = bisect.bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.names.insert(i, name)
+
+    def remove(self, name):
+        """Remove name; returns False if it was not indexed"""
+        key = name.casefold()
+        i = bisect.bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key:
+            if self.names[i] == name:
+                del self.keys[i]
+                del self.names[i]
+                return True
+            i += 1
+        return False
+
+    def search(self, prefix, limit=10):
+        """Up to limit names starting with prefix, in casefolded order"""
+        prefix = prefix.casefold()
+        start = bisect.bisect_left(self.keys, prefix)
+        if not prefix:
+            end = len(self.keys)
+        else:
+            # The first key past the prefix range starts with its successor
+            end = bisect.bisect_left(self.keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return self.names[start:end]
+
+
+def _trigrams(key):
+    """Distinct padded trigrams of a casefolded name"""
+    padded = f"\0\0{key}\0\0"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a, b, limit):
+    """Levenshtein distance of a and b, or limit + 1 once it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    """Typo-tolerant name lookup: trigram candidates checked by edit distance
+
+    Each name is split into padded trigrams, with a posting list of name
+    ids per trigram. One edit changes at most 3 trigrams, so a name
+    within max_distance shares at least len(grams) - 3 * max_distance of
+    the query's trigrams. It must therefore appear in at least one of the
+    3 * max_distance + 1 rarest postings, and in one more for each
+    further list read. Only the short lists are read. The candidates
+    are then verified with a bounded Levenshtein distance.
+    Queries too short for that bound fall back to a scan of the names of
+    a close enough length.
+    """
+
+    def __init__(self, names=()):
+        self.names = []
+        self.keys = []
+        self.ids = {}
+        self.postings = {}
+        self.removed = 0
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, name):
+        """Index name; a name already indexed is left alone"""
+        if name in self.ids:
+            return
+        key = name.casefold()
+        ident = len(self.names)
+        self.names.append(name)
+        self.keys.append(key)
+        self.ids[name] = ident
+        for gram in _trigrams(key):
+            self.postings.setdefault(gram, []).append(ident)
+
+    def remove(self, name):
+        """Forget name; returns False if it was not indexed
+
+        The postings keep the id of a removed name until more than half
+        of the ids are dead, then the index is rebuilt.
+        """
+        ident = self.ids.pop(name, None)
+        if ident is None:
+            return False
+        self.names[ident] = None
+        self.removed += 1
+        if self.removed > len(self.ids):
+            live = [name for name in self.names if name is not None]
+            self.names, self.keys, self.ids, self.postings, self.removed = [], [], {}, {}, 0
+            for name in live:
+                self.add(name)
+        return True
+
+    def search(self, query, max_distance=2, limit=10):
+        """Up to limit (name, distance) pairs within max_distance, closest first"""
+        key = query.casefold()
+        grams = _trigrams(key)
+        needed = len(grams) - 3 * max_distance
+        if needed > 0:
+            lists = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+            used = len(grams) - needed + 1
+            counts = Counter()
+            for postings in lists[:used]:
+                counts.update(postings)
+            # Each further list read raises the count a match must reach.
+            # A match is already among the counted ids, so only they are
+            # looked up in the longer lists while that stays cheap.
+            seen = set(counts)
+            budget = 2 * sum(counts.values()) + 1000
+            while used < len(lists) and len(lists[used]) <= budget:
+                counts.update(seen.intersection(lists[used]))
+                budget -= len(lists[used])
+                used += 1
+            required = used - (len(grams) - needed)
+            candidates = [ident for ident, count in counts.items() if count >= required]
+        else:
+            candidates = range(len(self.names))
+
+        matches = []
+        keys = self.keys
+        length = len(key)
+        for ident in candidates:
+            other = keys[ident]
+            if abs(len(other) - length) > max_distance or self.names[ident] is None:
+                continue
+            if needed > 0:
+                # Cheap count of shared trigrams before the quadratic check
+                padded = f"\0\0{other}\0\0"
+                if sum(gram in padded for gram in grams) < needed:
+                    continue
+            distance = _edit_distance(key, other, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, self.names[ident]))
+        matches.sort()
+        return [(name, distance) for distance, name in matches[:limit]]
+
+
+class TelephoneDirectory:
+    """Unified telephone directory application"""
+
+    # Backends kept up to date on every write unless single_backend is set
+    EAGER_METHODS = ("separate_chaining", "linear_probing", "quadratic_probing",
+                     "double_hashing")
+    
+    def __init__(self, size=100, method=None, single_backend=False, **table_options):
+        """Create the hash tables; table_options go to every HashTable
+
+        By default the EAGER_METHODS tables and the one for method are kept
+        up to date. With single_backend only the table for method is
+        materialized. Other backends are built from the primary table on
+        demand when methods are compared.
+        """
+        if method is not None and method not in HashTable.METHODS:
+            raise ValueError(f"Invalid method: {method}")
+        if single_backend:
+            method = method or "separate_chaining"
+
+        self.size = size
+        self.table_options = table_options
+        self.single_backend = single_backend
+        if single_backend:
+            methods = [method]
+        else:
+            methods = list(self.EAGER_METHODS)
+            if method is not None and method not in methods:
+                methods.append(method)
+        self.hashtables = {m: HashTable(size, m, **table_options) for m in methods}
+        self.current_method = method
+        # Secondary index for reverse lookups: tel_no -> records sharing it
+        self.number_index = {}
+        # Optional durability, see enable_wal()
+        self.wal = None
+        self.snapshot_path = None
+        self.checkpoint_every = None
+        self._logged = 0
+        # Adaptive backend selection, see enable_adaptive()
+        self.adaptive = None
+        # Optional hot-key cache, see enable_cache()
+        self.cache = None
+        # Name indexes, built on first use by complete() and fuzzy_search()
+        self.prefix_index = None
+        self.fuzzy_index = None
+
+    def enable_wal(self, path, snapshot_path=None, checkpoint_every=None, **wal_options):
+        """Recover from the last checkpoint and log, then log every change
+
+        The directory is reloaded from snapshot_path (if it exists) and the
+        records of the log at path are replayed on top. From then on every
+        insert and delete is appended to the log before it is applied.
+        With checkpoint_every, a checkpoint is taken after that many logged
+        operations. wal_options go to WriteAheadLog.
+        """
+        if snapshot_path is not None and os.path.exists(snapshot_path):
+            self._rebuild(list(HashTable.load(snapshot_path).records()))
+        replayed = WriteAheadLog.replay(path)
+        for operation, name, tel_no in replayed:
+            if operation == _WAL_INSERT:
+                self.insert(name, tel_no)
+            elif operation == _WAL_DELETE:
+                self.delete(name)
+        self.wal = WriteAheadLog(path, **wal_options)
+        self.snapshot_path = snapshot_path
+        self.checkpoint_every = checkpoint_every
+        self._logged = 0
+        return len(replayed)
+
+    def checkpoint(self):
+        """Save the primary table as the snapshot and empty the log"""
+        if self.wal is None or self.snapshot_path is None:
+            raise ValueError("Checkpoints need enable_wal() with a snapshot_path")
+        self.wal.commit()
+        # Write aside and rename, so a crash never leaves a half-written snapshot
+        partial = self.snapshot_path + ".tmp"
+        self._primary().save(partial)
+        os.replace(partial, self.snapshot_path)
+        self.wal.truncate()
+        self._logged = 0
+
+    def close(self):
+        """Commit and close the write-ahead log, if any"""
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
+
+    def _log(self, operation, name, tel_no=0):
+        """Append a mutation to the write-ahead log before it is applied"""
+        self.wal.append(operation, name, tel_no)
+        self._logged += 1
+    
+    def set_method(self, method):
+        """Set the current collision handling method"""
+        if method not in HashTable.METHODS:
+            print(f"Invalid method: {method}")
+            return False
+
+        if method not in self.hashtables:
+            self.hashtables[method] = self._build_table(method)
+        self.current_method = method
+        self._retire_tables()
+        if self.adaptive is not None:
+            self.adaptive.stale = True
+        return True
+
+    def _retire_tables(self):
+        """Drop materialized tables that are neither current nor eager"""
+        kept = () if self.single_backend else self.EAGER_METHODS
+        self.hashtables = {method: table for method, table in self.hashtables.items()
+                           if method == self.current_method or method in kept}
+
+    def _name_indexes(self):
+        """Build the prefix and fuzzy name indexes from the primary table"""
+        if self.prefix_index is None:
+            names = [record.name for record in self._primary().records()
+                     if isinstance(record.name, str)]
+            self.prefix_index = PrefixIndex(names)
+            self.fuzzy_index = FuzzyIndex(names)
+
+    def _index_name(self, name, previous, deleted=False):
+        """Keep the name indexes in step with an insert or delete"""
+        if not isinstance(name, str):
+            return
+        if deleted and previous is not None:
+            self.prefix_index.remove(name)
+            self.fuzzy_index.remove(name)
+        elif not deleted and previous is None:
+            self.prefix_index.add(name)
+            self.fuzzy_index.add(name)
+
+    def complete(self, prefix, limit=10):
+        """Records whose names start with prefix (case-insensitive), in name order
+
+        The name indexes are built on the first call and maintained by
+        every write after it.
+        """
+        self._name_indexes()
+        primary = self._primary()
+        return [primary._lookup(name)[0] for name in self.prefix_index.search(prefix, limit)]
+
+    def fuzzy_search(self, name, max_distance=2, limit=10):
+        """(record, edit distance) pairs for names within max_distance of name"""
+        self._name_indexes()
+        primary = self._primary()
+        return [(primary._lookup(match)[0], distance)
+                for match, distance in self.fuzzy_index.search(name, max_distance, limit)]
+
+    def enable_cache(self, capacity=4096, policy="lru", negative=True):
+        """Put a LookupCache in front of search() and search_many()
+
+        Inserts and deletes invalidate the name and numbers they touch;
+        bulk loads clear the cache. Returns the cache for its metrics.
+        """
+        self.cache = LookupCache(capacity, policy, negative)
+        return self.cache
+
+    def disable_cache(self):
+        """Remove the lookup cache"""
+        self.cache = None
+
+    def _invalidate(self, name, tel_no=None, previous=None):
+        """Drop cached results a write to name may have changed"""
+        keys = [name]
+        if tel_no is not None:
+            keys.append(tel_no)
+        if previous is not None:
+            keys.append(previous.tel_no)
+        self.cache.invalidate(*keys)
+
+    def enable_adaptive(self, evaluate_every=2000, sample_size=512, candidates=None,
+                        min_gain=0.1, probe_target=1.1, background=True, confirmations=2,
+                        cooldown=30.0):
+        """Pick the backend from live traffic and migrate to it online
+
+        Every evaluate_every lookups the window's traffic is summarized:
+        hit ratio, share of number lookups (served by the number index,
+        not the table), load factor and mean comparisons per table search.
+        If the tables could matter and probes exceed probe_target, every
+        candidate method is rebuilt from a copy of the records at the
+        current load, in a background thread, and timed on the sampled
+        keys. The directory switches to the fastest once it has beaten the
+        current method by min_gain in confirmations evaluations in a row,
+        and at least cooldown seconds after the previous switch. The switch
+        happens between two directory operations, after replaying any
+        writes made meanwhile.
+        Each evaluation is appended to adaptive.decisions; switches are
+        also printed.
+        """
+        if self.current_method is None:
+            raise ValueError("Adaptive mode needs a current method; call set_method() first")
+        if confirmations < 1:
+            raise ValueError("confirmations must be at least 1")
+        self.adaptive = _AdaptiveState(evaluate_every, sample_size,
+                                       list(candidates or HashTable.METHODS), min_gain,
+                                       probe_target, background, confirmations, cooldown)
+
+    def disable_adaptive(self):
+        """Stop sampling; an evaluation still running is discarded"""
+        self.adaptive = None
+
+    def _observe(self, key, found, comparisons=None):
+        """Add one lookup to the adaptive traffic sample"""
+        state = self.adaptive
+        state.lookups += 1
+        state.hits += found
+        if isinstance(key, int):
+            state.number_lookups += 1
+        else:
+            state.keys.append(key)
+        if comparisons is not None:
+            state.comparisons += comparisons
+            state.probed += 1
+
+        if state.result is not None:
+            self._adaptive_switch()
+        elif state.job is None and state.lookups >= state.evaluate_every:
+            self._adaptive_start()
+
+    def _note_write(self, operation, name, tel_no=None):
+        """Remember a write made while a replacement table is being built"""
+        if self.adaptive is not None and self.adaptive.job is not None:
+            self.adaptive.pending.append((operation, name, tel_no))
 
-class TelephoneDirectory:
-    """Unified telephone directory application"""
-    
-    def __init__(self, size=100):
-        self.size = size
-        self.hashtables = {
-            "separate_chaining": HashTable(size, "separate_chaining"),
-            "linear_probing": HashTable(size, "linear_probing"),
-            "quadratic_probing": HashTable(size, "quadratic_probing"),
-            "double_hashing": HashTable(size, "double_hashing")
+    def _adaptive_start(self):
+        """Summarize the traffic window and evaluate the candidates if worthwhile"""
+        state = self.adaptive
+        primary = self._primary()
+        features = {
+            "lookups": state.lookups,
+            "hit_ratio": state.hits / state.lookups,
+            "number_share": state.number_lookups / state.lookups,
+            "load_factor": len(primary) / primary.size,
+            # Batched lookups do not report comparisons
+            "mean_probes": state.comparisons / state.probed if state.probed else None,
         }
-        self.current_method = None
-    
-    def set_method(self, method):
-        """Set the current collision handling method"""
-        if method in self.hashtables:
-            self.current_method = method
-            return True
+        keys = list(state.keys)
+        state._reset_window()
+
+        if features["number_share"] > 0.9 or not keys:
+            self._decide(self.current_method, features, None,
+                         "lookups are served by the number index")
+            return
+        if features["mean_probes"] is not None and features["mean_probes"] <= state.probe_target:
+            self._decide(self.current_method, features, None,
+                         f"probes already at {features['mean_probes']:.2f}")
+            return
+
+        records = list(primary.records())
+        state.pending = []
+        state.stale = False
+        if state.background:
+            state.job = threading.Thread(target=self._adaptive_evaluate, daemon=True,
+                                         args=(state, records, keys, features))
+            state.job.start()
         else:
-            print(f"Invalid method: {method}")
-            return False
+            self._adaptive_evaluate(state, records, keys, features)
+            self._adaptive_switch()
+
+    def _adaptive_evaluate(self, state, records, keys, features):
+        """Rebuild each candidate from records and time it on the sampled keys
+
+        Runs in the background thread: it only reads its arguments and
+        hands the outcome over through state.result.
+        """
+        load_factor = min(0.9, max(0.1, features["load_factor"]))
+        timings = {}
+        tables = {}
+        for method in state.candidates:
+            table = HashTable.from_records(records, method, load_factor, **self.table_options)
+            search = table._lookup
+            start = time.perf_counter()
+            for _ in range(3):
+                for key in keys:
+                    search(key)
+            timings[method] = (time.perf_counter() - start) * 1e9 / (3 * len(keys))
+            tables[method] = table
+        state.result = (features, timings, tables)
+
+    def _adaptive_switch(self):
+        """Adopt the evaluation's winner if it is enough faster"""
+        state = self.adaptive
+        features, timings, tables = state.result
+        pending = state.pending
+        state.result = None
+        state.job = None
+        state.pending = []
+        current = self.current_method
+        best = min(timings, key=timings.get)
+
+        if state.stale:
+            self._decide(current, features, timings, "tables were rebuilt during the evaluation")
+            return
+        if best == current or current in timings and (
+                timings[best] > timings[current] * (1 - state.min_gain)):
+            state.leader, state.wins = None, 0
+            self._decide(current, features, timings,
+                         f"{current} is within {state.min_gain:.0%} of the best")
+            return
+
+        # Timings come from a thread competing with the foreground, so a
+        # win has to repeat before it is worth a rebuild
+        if best == state.leader:
+            state.wins += 1
+        else:
+            state.leader, state.wins = best, 1
+        since_switch = (None if state.last_switch is None
+                        else time.monotonic() - state.last_switch)
+        if state.wins < state.confirmations:
+            self._decide(current, features, timings,
+                         f"{best} ahead in {state.wins} of {state.confirmations} evaluations")
+        elif since_switch is not None and since_switch < state.cooldown:
+            self._decide(current, features, timings,
+                         f"{best} ahead, but the last switch was {since_switch:.1f}s ago")
+        else:
+            if best not in self.hashtables:
+                table = tables[best]
+                # Catch up on writes made while the table was being built
+                for operation, name, tel_no in pending:
+                    if operation == "insert":
+                        table.insert(name, tel_no)
+                    else:
+                        table.delete(name)
+                self.hashtables[best] = table
+            self.current_method = best
+            self._retire_tables()
+            state.leader, state.wins = None, 0
+            state.last_switch = time.monotonic()
+            self._decide(current, features, timings, f"switched {current} -> {best}", best)
+            print(f"Adaptive: switched {current} -> {best} "
+                  f"({timings.get(current, float('nan')):.0f} -> {timings[best]:.0f} ns/lookup)")
+
+    def _decide(self, method, features, timings, reason, switched_to=None):
+        """Log one adaptive decision taken while method was current"""
+        self.adaptive.decisions.append({
+            "time": time.time(),
+            "method": method,
+            "switched_to": switched_to,
+            "reason": reason,
+            "features": features,
+            "ns_per_lookup": timings,
+        })
+
+    def _build_table(self, method):
+        """Build a table for method, presized for the records of the primary table
+
+        Raises ValueError if a record cannot be placed; the existing tables
+        are left untouched.
+        """
+        return HashTable.from_records(list(self._primary().records()), method,
+                                      min_size=self.size, **self.table_options)
+
+    def _table(self, method):
+        """Materialized table for method, or a temporary one built on demand"""
+        if method in self.hashtables:
+            return self.hashtables[method]
+        return self._build_table(method)
     
     def insert(self, name, tel_no):
         """Insert a record into all hash tables"""
+        if self.wal is not None:
+            self._log(_WAL_INSERT, name, tel_no)
+        self._note_write("insert", name, tel_no)
+        previous = self._find_name(name)
+        if self.cache is not None:
+            self._invalidate(name, tel_no, previous)
+        if self.prefix_index is not None:
+            self._index_name(name, previous)
         success = True
         for method, hashtable in self.hashtables.items():
             if not hashtable.insert(name, tel_no):
                 print(f"Failed to insert using {method}")
                 success = False
+
+        if previous is not None:
+            self._unindex_number(previous)
+        self.number_index.setdefault(tel_no, []).append(TelephoneRecord(name, tel_no))
+        self._maybe_checkpoint()
         return success
+
+    def insert_many(self, records):
+        """Insert (name, tel_no) pairs in one pass; returns how many were stored
+
+        Unlike bulk_load this does not rebuild the tables, so it suits a
+        stream of chunks; each table is grown up front to take the whole
+        chunk. Each record object is shared by every table and the number
+        index. A record that some table still refuses is left out of every
+        table and index.
+        """
+        if not hasattr(records, '__len__'):
+            records = list(records)
+        tables = list(self.hashtables.values())
+        for hashtable in tables:
+            hashtable.reserve(len(hashtable) + len(records))
+        primary = self._primary()
+        inserted = 0
+        for name, tel_no in records:
+            if self.wal is not None:
+                self._log(_WAL_INSERT, name, tel_no)
+            previous = primary._lookup(name)[0]
+            record = TelephoneRecord(name, tel_no)
+            stored = []
+            for hashtable in tables:
+                if not hashtable.insert(record):
+                    break
+                stored.append(hashtable)
+            if len(stored) < len(tables):
+                if previous is None:
+                    for hashtable in stored:
+                        hashtable.delete(name)
+                continue
+            self._note_write("insert", name, tel_no)
+            if self.cache is not None:
+                self._invalidate(name, tel_no, previous)
+            if self.prefix_index is not None:
+                self._index_name(name, previous)
+            if previous is not None:
+                self._unindex_number(previous)
+            self.number_index.setdefault(tel_no, []).append(record)
+            inserted += 1
+        self._maybe_checkpoint()
+        return inserted
+
+    def _maybe_checkpoint(self):
+        """Take a checkpoint once checkpoint_every operations have been logged"""
+        if self.checkpoint_every is not None and self._logged >= self.checkpoint_every:
+            self.checkpoint()
+
+    def bulk_load(self, records, load_factor=0.5):
+        """Load many (name, tel_no) records at once, rebuilding presized tables"""
+        start = time.perf_counter()
+        merged = {record.name: record for record in self._primary().records()}
+        for name, tel_no in records:
+            merged[name] = TelephoneRecord(name, tel_no)
+            if self.wal is not None:
+                self._log(_WAL_INSERT, name, tel_no)
+        loaded = list(merged.values())
+        self._rebuild(loaded, load_factor)
+        self._maybe_checkpoint()
+
+        elapsed = time.perf_counter() - start
+        rate = len(loaded) / elapsed if elapsed > 0 else float("inf")
+        print(f"Loaded {len(loaded)} records in {elapsed:.3f}s ({rate:,.0f} records/sec)")
+        return len(loaded)
+
+    def _rebuild(self, records, load_factor=0.5):
+        """Replace every table and the number index with presized ones holding records"""
+        if self.adaptive is not None:
+            self.adaptive.stale = True
+        if self.cache is not None:
+            self.cache.clear()
+        # Every table shares the same record objects
+        for method in self.hashtables:
+            self.hashtables[method] = HashTable.from_records(
+                records, method, load_factor, **self.table_options)
+
+        self.number_index = {}
+        for record in records:
+            self.number_index.setdefault(record.tel_no, []).append(record)
+        if self.prefix_index is not None:
+            self.prefix_index = None
+            self._name_indexes()
+
+    def _primary(self):
+        """Hash table used for directory-internal lookups"""
+        return self.hashtables[self.current_method or "separate_chaining"]
+
+    def _find_name(self, name):
+        """Return the stored record for name from the primary hash table"""
+        return self._primary()._lookup(name)[0]
+
+    def _unindex_number(self, record):
+        """Drop a record's entry from the number index"""
+        records = self.number_index.get(record.tel_no, [])
+        records[:] = [item for item in records if item.name != record.name]
+        if not records:
+            self.number_index.pop(record.tel_no, None)
+
+    def lookup_number(self, tel_no):
+        """Reverse lookup: return the record owning tel_no, or None"""
+        records = self.number_index.get(tel_no)
+        return records[0] if records else None
+
+    def search_many(self, keys):
+        """Look up a batch of names and numbers quietly; returns the records
+
+        Names are resolved in one HashTable.search_many call on the primary
+        table, numbers through the number index. Missing keys give None.
+        With a cache only the keys it cannot answer reach the tables.
+        """
+        keys = list(keys)
+        cache = self.cache
+        if cache is None:
+            return self._search_uncached(keys)
+        results = [cache.get(key) for key in keys]
+        missing = [i for i, record in enumerate(results) if record is _NOT_CACHED]
+        if not missing:
+            return results
+        found = self._search_uncached([keys[i] for i in missing])
+        for i, record in zip(missing, found):
+            results[i] = record
+            cache.put(keys[i], record)
+        return results
+
+    def _search_uncached(self, keys):
+        """search_many() without the cache"""
+        results = [None] * len(keys)
+        names = [i for i, key in enumerate(keys) if not isinstance(key, int)]
+        found = self._primary().search_many([keys[i] for i in names])
+        for i, record in zip(names, found):
+            results[i] = record
+        for i, key in enumerate(keys):
+            if isinstance(key, int):
+                results[i] = self.lookup_number(key)
+        if self.adaptive is not None:
+            for key, record in zip(keys, results):
+                self._observe(key, record is not None)
+        return results
     
     def search(self, key, compare_methods=False):
         """Search for a record in the hash tables"""
@@ -391,20 +2950,49 @@ class TelephoneDirectory:
             print("Method\t\t\tResult\tComparisons")
             print("-"*60)
             
-            for method, hashtable in self.hashtables.items():
-                result, comparisons = hashtable.search(key)
+            for method in HashTable.METHODS:
+                result, comparisons = self._table(method)._lookup(key)
                 status = "Found" if result else "Not found"
                 print(f"{method:<20}\t{status}\t{comparisons}")
             
             print("="*60)
             return None
+
+        if self.cache is not None and self.current_method:
+            result = self.cache.get(key)
+            if result is not _NOT_CACHED:
+                if result:
+                    print("\nRecord found in the cache:")
+                    print(result)
+                else:
+                    print("\nRecord not found (cached miss)")
+                return result
+
+        if self.current_method and isinstance(key, int):
+            # Records are hashed by name, so numbers go through the number index
+            result = self.lookup_number(key)
+            if result:
+                print("\nRecord found using the number index:")
+                print(result)
+            else:
+                print("\nRecord not found in the number index")
+            if self.adaptive is not None:
+                self._observe(key, result is not None)
+            if self.cache is not None:
+                self.cache.put(key, result)
+            return result
         elif self.current_method:
-            result, comparisons = self.hashtables[self.current_method].search(key)
+            method = self.current_method
+            result, comparisons = self.hashtables[method].search(key)
+            if self.adaptive is not None:
+                self._observe(key, result is not None, comparisons)
             if result:
-                print(f"\nRecord found using {self.current_method}:")
+                print(f"\nRecord found using {method}:")
                 print(f"{result} (required {comparisons} comparisons)")
             else:
-                print(f"\nRecord not found using {self.current_method} ({comparisons} comparisons made)")
+                print(f"\nRecord not found using {method} ({comparisons} comparisons made)")
+            if self.cache is not None:
+                self.cache.put(key, result)
             return result
         else:
             print("No method selected. Use set_method() first.")
@@ -413,8 +3001,8 @@ class TelephoneDirectory:
     def display(self, method=None):
         """Display the hash table for the specified method"""
         if method:
-            if method in self.hashtables:
-                self.hashtables[method].display()
+            if method in HashTable.METHODS:
+                self._table(method).display()
             else:
                 print(f"Invalid method: {method}")
         elif self.current_method:
@@ -425,8 +3013,8 @@ class TelephoneDirectory:
     def stats(self, method=None):
         """Display statistics for the specified method"""
         if method:
-            if method in self.hashtables:
-                self.hashtables[method].stats()
+            if method in HashTable.METHODS:
+                self._table(method).stats()
             else:
                 print(f"Invalid method: {method}")
         elif self.current_method:
@@ -434,10 +3022,1095 @@ class TelephoneDirectory:
         else:
             print("No method selected. Use set_method() or specify a method.")
     
+    def delete(self, name):
+        """Delete a record from all hash tables"""
+        if self.wal is not None:
+            self._log(_WAL_DELETE, name)
+        self._note_write("delete", name)
+        previous = self._find_name(name)
+        if self.cache is not None:
+            self._invalidate(name, previous=previous)
+        if self.prefix_index is not None:
+            self._index_name(name, previous, deleted=True)
+        success = True
+        for method, hashtable in self.hashtables.items():
+            if not hashtable.delete(name):
+                success = False
+
+        if previous is not None:
+            self._unindex_number(previous)
+        self._maybe_checkpoint()
+        return success
+
     def compare_methods(self):
         """Compare all collision handling methods"""
-        for method, hashtable in self.hashtables.items():
-            hashtable.stats()
+        for method in HashTable.METHODS:
+            self._table(method).stats()
+
+
+def _table_summary(table):
+    """Plain-data statistics of a HashTable, cheap to send between processes"""
+    probes = table.probe_lengths()
+    return {
+        "method": table.method,
+        "count": len(table),
+        "size": table.size,
+        "avg_probes": sum(probes) / len(probes) if probes else 0.0,
+        "max_probes": max(probes, default=0),
+        "resizes": table.resize_count,
+    }
+
+
+def _unindex_shard_number(numbers, record):
+    """Drop record from a shard's number map, keeping other owners of its number"""
+    records = numbers.get(record.tel_no, [])
+    records[:] = [item for item in records if item.name != record.name]
+    if not records:
+        numbers.pop(record.tel_no, None)
+
+
+def _shard_worker(connection, size, method, options):
+    """Serve batched requests for one shard of a ShardedDirectory until closed"""
+    table = HashTable(size, method, **options)
+    # tel_no -> records sharing it, for reverse lookups broadcast to every shard
+    numbers = {}
+    while True:
+        operation, payload = connection.recv()
+        try:
+            if operation == "insert":
+                reply = []
+                for name, tel_no in payload:
+                    previous = table._lookup(name)[0]
+                    record = TelephoneRecord(name, tel_no)
+                    stored = table.insert(record)
+                    # A record the table refused must not show up in number lookups
+                    if stored:
+                        if previous is not None:
+                            _unindex_shard_number(numbers, previous)
+                        numbers.setdefault(tel_no, []).append(record)
+                    reply.append(stored)
+            elif operation == "search":
+                reply = table.search_many(payload)
+            elif operation == "lookup_numbers":
+                reply = [numbers[tel_no][0] if tel_no in numbers else None
+                         for tel_no in payload]
+            elif operation == "delete":
+                reply = []
+                for name in payload:
+                    previous = table._lookup(name)[0]
+                    if previous is not None:
+                        _unindex_shard_number(numbers, previous)
+                    reply.append(table.delete(name))
+            elif operation == "stats":
+                reply = _table_summary(table)
+            elif operation == "compare":
+                records = list(table.records())
+                reply = {method: _table_summary(HashTable.from_records(records, method,
+                                                                       **options))
+                         for method in HashTable.METHODS}
+            elif operation == "close":
+                connection.send(None)
+                break
+            else:
+                raise ValueError(f"Unknown shard operation: {operation}")
+        except Exception as error:
+            reply = error
+        connection.send(reply)
+    connection.close()
+
+
+class ShardedDirectory:
+    """Telephone directory partitioned by name hash across worker processes
+
+    Each worker process owns one HashTable shard, so inserts and lookups
+    are spread over several interpreters (and cores) instead of sharing
+    one GIL. Requests are batched per shard and sent over pipes: a batch
+    call scatters one message to every shard involved and then gathers
+    the replies. Numbers are not part of the partition key, so number
+    lookups, stats and compare_methods go to every shard.
+    """
+
+    def __init__(self, shards=None, size=100, method="separate_chaining", **table_options):
+        if method not in HashTable.METHODS:
+            raise ValueError(f"Invalid collision handling method: {method}")
+        self.shards = shards or os.cpu_count() or 1
+        self.method = method
+        self._connections = []
+        self._workers = []
+        shard_size = max(1, -(-size // self.shards))
+        for _ in range(self.shards):
+            connection, child = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_shard_worker, daemon=True,
+                                             args=(child, shard_size, method, table_options))
+            worker.start()
+            child.close()
+            self._connections.append(connection)
+            self._workers.append(worker)
+
+    def _shard(self, name):
+        """Shard owning name; fnv1a is stable across processes, unlike hash()"""
+        return _fnv1a_hash(name, 0) % self.shards
+
+    def _scatter(self, operation, payloads):
+        """Send payloads[shard] to each listed shard, then gather the replies"""
+        for shard, payload in payloads.items():
+            self._connections[shard].send((operation, payload))
+        replies = {shard: self._connections[shard].recv() for shard in payloads}
+        for reply in replies.values():
+            if isinstance(reply, Exception):
+                raise reply
+        return replies
+
+    def _route(self, keys):
+        """Group keys by owning shard as {shard: (positions, keys)}"""
+        batches = {}
+        for position, key in enumerate(keys):
+            positions, batch = batches.setdefault(self._shard(key), ([], []))
+            positions.append(position)
+            batch.append(key)
+        return batches
+
+    def insert_many(self, records):
+        """Insert (name, tel_no) pairs; returns a list of booleans, True where the record was stored"""
+        records = list(records)
+        results = [False] * len(records)
+        batches = self._route([name for name, _ in records])
+        replies = self._scatter("insert", {shard: [records[position] for position in positions]
+                                           for shard, (positions, _) in batches.items()})
+        for shard, (positions, _) in batches.items():
+            for position, stored in zip(positions, replies[shard]):
+                results[position] = stored
+        return results
+
+    def search_many(self, keys):
+        """Look up names and numbers in batches; returns records (None if missing)"""
+        keys = list(keys)
+        results = [None] * len(keys)
+        names = [key for key in keys if not isinstance(key, int)]
+        numbers = [key for key in keys if isinstance(key, int)]
+        name_positions = [i for i, key in enumerate(keys) if not isinstance(key, int)]
+        number_positions = [i for i, key in enumerate(keys) if isinstance(key, int)]
+
+        batches = self._route(names)
+        replies = self._scatter("search", {shard: batch for shard, (_, batch) in batches.items()})
+        for shard, (positions, _) in batches.items():
+            for position, record in zip(positions, replies[shard]):
+                results[name_positions[position]] = record
+
+        if numbers:
+            replies = self._scatter("lookup_numbers", dict.fromkeys(range(self.shards), numbers))
+            for shard in range(self.shards):
+                for position, record in zip(number_positions, replies[shard]):
+                    if record is not None:
+                        results[position] = record
+        return results
+
+    def delete_many(self, names):
+        """Delete names; returns a list of booleans, True where a record was removed"""
+        names = list(names)
+        results = [False] * len(names)
+        batches = self._route(names)
+        replies = self._scatter("delete", {shard: batch for shard, (_, batch) in batches.items()})
+        for shard, (positions, _) in batches.items():
+            for position, removed in zip(positions, replies[shard]):
+                results[position] = removed
+        return results
+
+    def insert(self, name, tel_no):
+        """Insert or update one record; returns True if it was stored"""
+        return self.insert_many([(name, tel_no)])[0]
+
+    def search(self, key):
+        """Look up one name or number; returns the record or None"""
+        return self.search_many([key])[0]
+
+    def delete(self, name):
+        """Delete one record; returns True if it existed"""
+        return self.delete_many([name])[0]
+
+    def stats(self):
+        """Gather and display per-shard statistics"""
+        replies = self._scatter("stats", dict.fromkeys(range(self.shards)))
+        print("\n" + "="*60)
+        print(f"SHARDED DIRECTORY STATISTICS ({self.method}, {self.shards} shards)")
+        print("="*60)
+        print("Shard\tEntries\tSize\tAvg probes\tMax probes")
+        print("-"*60)
+        for shard in range(self.shards):
+            summary = replies[shard]
+            print(f"{shard}\t{summary['count']}\t{summary['size']}"
+                  f"\t{summary['avg_probes']:.2f}\t\t{summary['max_probes']}")
+        print("-"*60)
+        print(f"Total entries: {sum(summary['count'] for summary in replies.values())}")
+        print("="*60)
+        return [replies[shard] for shard in range(self.shards)]
+
+    def compare_methods(self):
+        """Rebuild every shard with each method and compare the combined probes"""
+        replies = self._scatter("compare", dict.fromkeys(range(self.shards)))
+        report = {}
+        print("\n" + "="*60)
+        print(f"SHARDED COMPARISON OF COLLISION HANDLING METHODS ({self.shards} shards)")
+        print("="*60)
+        print("Method\t\t\tEntries\tAvg probes\tMax probes")
+        print("-"*60)
+        for method in HashTable.METHODS:
+            summaries = [replies[shard][method] for shard in range(self.shards)]
+            count = sum(summary["count"] for summary in summaries)
+            report[method] = {
+                "count": count,
+                "avg_probes": (sum(summary["avg_probes"] * summary["count"]
+                                   for summary in summaries) / count) if count else 0.0,
+                "max_probes": max(summary["max_probes"] for summary in summaries),
+            }
+            print(f"{method:<20}\t{count}\t{report[method]['avg_probes']:.2f}"
+                  f"\t\t{report[method]['max_probes']}")
+        print("="*60)
+        return report
+
+    def close(self):
+        """Stop the worker processes"""
+        for connection in self._connections:
+            try:
+                connection.send(("close", None))
+                connection.recv()
+            except (EOFError, OSError):
+                pass
+            connection.close()
+        for worker in self._workers:
+            worker.join()
+        self._connections = []
+        self._workers = []
+
+
+class AsyncDirectory:
+    """asyncio front-end that coalesces concurrent requests into batches
+
+    asearch/ainsert/adelete queue a request and await its result. A single
+    batcher task waits up to window seconds (or until max_batch requests
+    are queued), then runs the whole batch against the directory, with
+    consecutive searches served by one search_many call. Requests run in
+    arrival order, so a search sees every insert queued before it. The
+    queue holds at most max_pending requests; callers beyond that wait in
+    put(), which is the backpressure.
+    """
+
+    def __init__(self, directory=None, window=0.001, max_batch=1024, max_pending=10000):
+        self.directory = directory if directory is not None else TelephoneDirectory()
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.batches = 0
+        self.requests = 0
+        self._queue = None
+        self._batcher = None
+        # Requests taken off the queue but not executed yet
+        self._batch = []
+
+    def start(self):
+        """Start the batcher on the running event loop"""
+        if self._batcher is None:
+            self._queue = asyncio.Queue(self.max_pending)
+            self._batcher = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        """Stop the batcher, failing requests that were still queued or being collected"""
+        if self._batcher is None:
+            return
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        unfinished = self._batch
+        while not self._queue.empty():
+            unfinished.append(self._queue.get_nowait())
+        for _, _, future in unfinished:
+            if not future.done():
+                future.set_exception(RuntimeError("AsyncDirectory closed"))
+        self._batch = []
+        self._batcher = None
+        self._queue = None
+
+    async def _submit(self, operation, payload):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, payload, future))
+        return await future
+
+    async def asearch(self, key):
+        """Look up a name or number; returns the record or None"""
+        return await self._submit("search", key)
+
+    async def ainsert(self, name, tel_no):
+        """Insert or update a record; returns True on success"""
+        return await self._submit("insert", (name, tel_no))
+
+    async def adelete(self, name):
+        """Delete a record; returns True if it existed"""
+        return await self._submit("delete", name)
+
+    async def _run(self):
+        """Collect requests for up to window seconds and execute them as one batch"""
+        loop = asyncio.get_running_loop()
+        while True:
+            # Kept on the instance so close() can fail a half-collected batch
+            batch = self._batch
+            batch.append(await self._queue.get())
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._batch = []
+            self._execute(batch)
+
+    def _execute(self, batch):
+        """Apply a batch in order, serving each run of searches with search_many"""
+        self.batches += 1
+        self.requests += len(batch)
+        directory = self.directory
+        i = 0
+        while i < len(batch):
+            operation = batch[i][0]
+            j = i
+            while j < len(batch) and batch[j][0] == operation:
+                j += 1
+            run = batch[i:j]
+            try:
+                if operation == "search":
+                    results = directory.search_many([payload for _, payload, _ in run])
+                elif operation == "insert":
+                    results = [directory.insert(*payload) for _, payload, _ in run]
+                else:
+                    results = [directory.delete(payload) for _, payload, _ in run]
+            except Exception as error:
+                for _, _, future in run:
+                    if not future.done():
+                        future.set_exception(error)
+            else:
+                for (_, _, future), result in zip(run, results):
+                    if not future.done():
+                        future.set_result(result)
+            i = j
+
+    async def _handle_client(self, reader, writer):
+        """Serve one connection of the line protocol described in serve()"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode("utf-8", "replace").split()
+                command = parts[0].upper() if parts else ""
+                try:
+                    if command == "GET" and len(parts) >= 2:
+                        key = " ".join(parts[1:])
+                        record = await self.asearch(int(key) if key.isdigit() else key)
+                        reply = (f"OK {record.name} {record.tel_no}" if record is not None
+                                 else "NOT_FOUND")
+                    elif command == "PUT" and len(parts) >= 3 and parts[-1].isdigit():
+                        await self.ainsert(" ".join(parts[1:-1]), int(parts[-1]))
+                        reply = "OK"
+                    elif command == "DEL" and len(parts) >= 2:
+                        found = await self.adelete(" ".join(parts[1:]))
+                        reply = "OK" if found else "NOT_FOUND"
+                    else:
+                        reply = "ERR usage: GET <name|number> | PUT <name> <number> | DEL <name>"
+                except Exception as error:
+                    reply = f"ERR {error}"
+                writer.write(reply.encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None):
+        """Start a lookup server on TCP host:port, or on a Unix socket at path
+
+        The protocol is one request per line, answered by one line:
+        GET <name|number> -> "OK <name> <number>" or "NOT_FOUND",
+        PUT <name> <number> -> "OK", DEL <name> -> "OK" or "NOT_FOUND".
+        Requests from all clients share the batcher, so concurrent
+        lookups are coalesced. Returns the asyncio server.
+        """
+        self.start()
+        if path is not None:
+            return await asyncio.start_unix_server(self._handle_client, path=path)
+        return await asyncio.start_server(self._handle_client, host, port)
+
+
+def run_lookup_server(directory=None, host="127.0.0.1", port=8765, path=None, **options):
+    """Run an AsyncDirectory lookup server until interrupted"""
+    async def serve():
+        front = AsyncDirectory(directory, **options)
+        server = await front.serve(host, port, path)
+        print(f"Serving lookups on {path or f'{host}:{port}'}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await front.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("Server stopped")
+
+
+# Column names accepted for the two record fields when importing
+_NAME_COLUMNS = ("name",)
+_NUMBER_COLUMNS = ("tel_no", "number", "phone", "telephone")
+
+
+def _open_text(path, mode):
+    """Open a text file for streaming, transparently (de)compressing .gz"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _record_format(path, format):
+    """csv or jsonl, from format or else from the file extension"""
+    format = format or ("jsonl" if path.replace(".gz", "").endswith((".jsonl", ".ndjson"))
+                        else "csv")
+    if format not in ("csv", "jsonl"):
+        raise ValueError(f"Invalid record format: {format}")
+    return format
+
+
+def parse_number(value):
+    """Validate a telephone number and return it as an int
+
+    Spaces, dashes, dots, brackets and a leading + are ignored; what is
+    left must be 3 to 15 digits (the E.164 maximum).
+    """
+    text = str(value).strip()
+    if text.startswith("+"):
+        text = text[1:]
+    for separator in " -.()":
+        text = text.replace(separator, "")
+    if not text.isdigit() or not 3 <= len(text) <= 15:
+        raise ValueError(f"Invalid telephone number: {value!r}")
+    return int(text)
+
+
+def _raw_rows(path, format):
+    """Yield (line number, name, number) from a CSV or JSONL file, one row at a time"""
+    with _open_text(path, "r") as f:
+        if format == "jsonl":
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    yield line_number, None, None
+                    continue
+                if not isinstance(row, dict):
+                    yield line_number, None, None
+                    continue
+                number = next((row[column] for column in _NUMBER_COLUMNS if column in row), None)
+                yield line_number, row.get("name"), number
+            return
+
+        name_column, number_column = 0, 1
+        for line_number, row in enumerate(csv.reader(f), 1):
+            if not row:
+                continue
+            if line_number == 1:
+                header = [cell.strip().lower() for cell in row]
+                names = [i for i, cell in enumerate(header) if cell in _NAME_COLUMNS]
+                numbers = [i for i, cell in enumerate(header) if cell in _NUMBER_COLUMNS]
+                if names and numbers:
+                    name_column, number_column = names[0], numbers[0]
+                    continue
+            if len(row) <= max(name_column, number_column):
+                yield line_number, None, None
+            else:
+                yield line_number, row[name_column], row[number_column]
+
+
+def read_records(path, format=None, chunk_size=10000, on_error="skip", rejected=None):
+    """Stream validated (name, tel_no) records from a file in lists of chunk_size
+
+    format is "csv" or "jsonl" (guessed from the extension by default, .gz
+    files are decompressed on the fly). A CSV may start with a header
+    naming its name and tel_no/number/phone columns, otherwise the first
+    two columns are used. Only one chunk is held in memory at a time.
+    Invalid rows raise ValueError with on_error="raise"; with "skip" they
+    are dropped and, if rejected is a list, their line numbers appended.
+    """
+    if on_error not in ("skip", "raise"):
+        raise ValueError(f"Invalid on_error mode: {on_error}")
+    chunk = []
+    for line_number, name, number in _raw_rows(path, _record_format(path, format)):
+        try:
+            name = str(name).strip() if name is not None else ""
+            if not name:
+                raise ValueError("Missing name")
+            chunk.append((name, parse_number(number)))
+        except ValueError as error:
+            if on_error == "raise":
+                raise ValueError(f"{path}:{line_number}: {error}") from None
+            if rejected is not None:
+                rejected.append(line_number)
+            continue
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_records(directory, path, format=None, chunk_size=10000, on_error="skip"):
+    """Stream a CSV/JSONL file into a TelephoneDirectory and print rows/sec"""
+    start = time.perf_counter()
+    rejected = []
+    first_invalid = []
+    imported = invalid = failed = 0
+    chunks = read_records(path, format, chunk_size, on_error, rejected)
+    while True:
+        chunk = next(chunks, None)
+        # Count the rejected rows but keep only the first few line numbers
+        invalid += len(rejected)
+        first_invalid += rejected[:10 - len(first_invalid)]
+        del rejected[:]
+        if chunk is None:
+            break
+        stored = directory.insert_many(chunk)
+        imported += stored
+        failed += len(chunk) - stored
+
+    elapsed = time.perf_counter() - start
+    rate = (imported + invalid + failed) / elapsed if elapsed > 0 else float("inf")
+    print(f"Imported {imported} records from {path} in {elapsed:.3f}s ({rate:,.0f} rows/sec)")
+    if invalid:
+        print(f"Skipped {invalid} invalid rows, first at lines: "
+              f"{', '.join(map(str, first_invalid))}")
+    if failed:
+        print(f"Failed to store {failed} records")
+    return {"imported": imported, "invalid": invalid, "failed": failed, "seconds": elapsed,
+            "rows_per_sec": rate, "first_invalid_lines": first_invalid}
+
+
+def export_records(source, path, format=None):
+    """Stream the records of a TelephoneDirectory or HashTable to CSV/JSONL"""
+    format = _record_format(path, format)
+    table = source._primary() if isinstance(source, TelephoneDirectory) else source
+    start = time.perf_counter()
+    exported = 0
+    with _open_text(path, "w") as f:
+        if format == "csv":
+            writer = csv.writer(f)
+            writer.writerow(["name", "tel_no"])
+            for record in table.records():
+                writer.writerow([record.name, record.tel_no])
+                exported += 1
+        else:
+            for record in table.records():
+                f.write(json.dumps({"name": record.name, "tel_no": record.tel_no}) + "\n")
+                exported += 1
+    elapsed = time.perf_counter() - start
+    rate = exported / elapsed if elapsed > 0 else float("inf")
+    print(f"Exported {exported} records to {path} in {elapsed:.3f}s ({rate:,.0f} rows/sec)")
+    return exported
+
+
+def hash_distribution_report(keys, size=None, method="separate_chaining",
+                             strategies=None, seed=0):
+    """Compare chain/probe lengths of the hash strategies on a set of keys"""
+    keys = list(keys)
+    size = size or _next_prime(len(keys) * 2)
+    report = {}
+
+    print("\n" + "="*60)
+    print(f"HASH DISTRIBUTION ({method}, {len(keys)} keys, size {size})")
+    print("="*60)
+    print("Strategy\tEmpty\tAvg probes\tMax probes")
+    print("-"*60)
+
+    for strategy in strategies or HASH_STRATEGIES:
+        table = HashTable(size, method, hash_strategy=strategy, hash_seed=seed)
+        for key in keys:
+            table.insert(key)
+        probes = [table.search(key)[1] for key in keys]
+
+        if method == "separate_chaining":
+            empty = sum(1 for chain in table.table if not chain)
+        else:
+            empty = sum(1 for item in table.table if item is None)
+        report[strategy] = {
+            "empty": empty,
+            "avg_probes": sum(probes) / len(probes) if probes else 0.0,
+            "max_probes": max(probes, default=0),
+        }
+        print(f"{strategy:<10}\t{empty}\t{report[strategy]['avg_probes']:.2f}"
+              f"\t\t{report[strategy]['max_probes']}")
+
+    print("="*60)
+    return report
+
+
+def storage_memory_report(count=100000, methods=None, load_factor=0.5):
+    """Compare memory per record of object and compact storage"""
+    records = [(f"Subscriber{i}", 9000000000 + i) for i in range(count)]
+    report = {}
+
+    print("\n" + "="*60)
+    print(f"STORAGE MEMORY ({count} records, load factor {load_factor})")
+    print("="*60)
+    print("Method\t\t\tObjects\t\tCompact\t\t(bytes/record)")
+    print("-"*60)
+
+    for method in methods or HashTable.METHODS:
+        report[method] = {}
+        for storage in ("objects", "compact"):
+            table = HashTable.from_records(records, method, load_factor, storage=storage)
+            report[method][storage] = table.memory_usage() / count
+        print(f"{method:<20}\t{report[method]['objects']:.1f}"
+              f"\t\t{report[method]['compact']:.1f}")
+
+    print("="*60)
+    return report
+
+
+def benchmark_search(count=10000, lookups=100000, methods=None, load_factor=0.5, **options):
+    """Time HashTable.search per method and print nanoseconds per lookup"""
+    records = [(f"Subscriber{i}", 9000000000 + i) for i in range(count)]
+    hits = [records[i % count][0] for i in range(lookups)]
+    misses = [f"Missing{i}" for i in range(lookups)]
+    report = {}
+
+    print("\n" + "="*60)
+    print(f"SEARCH BENCHMARK ({count} records, {lookups} lookups)")
+    print("="*60)
+    print("Method\t\t\tHit (ns)\tMiss (ns)")
+    print("-"*60)
+
+    for method in methods or HashTable.METHODS:
+        table = HashTable.from_records(records, method, load_factor, **options)
+        search = table.search
+        report[method] = {}
+        for label, keys in (("hit", hits), ("miss", misses)):
+            start = time.perf_counter_ns()
+            for key in keys:
+                search(key)
+            report[method][label] = (time.perf_counter_ns() - start) / len(keys)
+        print(f"{method:<20}\t{report[method]['hit']:.0f}\t\t{report[method]['miss']:.0f}")
+
+    print("="*60)
+    return report
+
+
+def concurrency_stress_test(count=10000, lookups=20000, threads=(1, 2, 4, 8),
+                            method="separate_chaining", writers=True, **options):
+    """Hammer a ConcurrentHashTable from reader threads and print reads/sec
+
+    Every reader checks each record it finds against the value it must
+    have. With writers=True one thread keeps updating and deleting a
+    separate set of keys meanwhile. On a GIL build of CPython the readers
+    share one core, so reads/sec stays roughly flat as threads are added;
+    a free-threaded build is needed to see reads scale.
+    """
+    table = ConcurrentHashTable(count * 2, method, **options)
+    for i in range(count):
+        table.insert(f"Subscriber{i}", 9000000000 + i)
+    errors = []
+    report = {}
+
+    def reader(seed):
+        for i in range(lookups):
+            j = (seed * 7919 + i * 104729) % count
+            record, comparisons = table.search(f"Subscriber{j}")
+            if record is None or record.tel_no != 9000000000 + j:
+                errors.append((f"Subscriber{j}", record))
+
+    def writer(stop):
+        i = 0
+        while not stop.is_set():
+            key = f"Churn{i % 500}"
+            if i % 3 == 2:
+                table.delete(key)
+            else:
+                table.insert(key, i)
+            i += 1
+
+    print("\n" + "="*60)
+    print(f"CONCURRENCY STRESS TEST ({method}, {count} records, {lookups} lookups/thread)")
+    print("="*60)
+    print("Threads\tReads/sec\tSpeedup")
+    print("-"*60)
+
+    for n in threads:
+        stop = threading.Event()
+        background = threading.Thread(target=writer, args=(stop,)) if writers else None
+        if background:
+            background.start()
+        workers = [threading.Thread(target=reader, args=(seed,)) for seed in range(n)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        if background:
+            background.join()
+        report[n] = n * lookups / elapsed
+        print(f"{n}\t{report[n]:,.0f}\t\t{report[n] / report[threads[0]]:.2f}x")
+
+    print("-"*60)
+    print(f"Wrong or missing results: {len(errors)}")
+    print("="*60)
+    return report
+
+
+def benchmark_sharded(count=100000, shard_counts=None, batch_size=1000,
+                      method="separate_chaining", **options):
+    """Time batched inserts and searches on a ShardedDirectory per shard count"""
+    shard_counts = shard_counts or sorted({1, 2, os.cpu_count() or 1})
+    records = [(f"Subscriber{i}", 9000000000 + i) for i in range(count)]
+    names = [name for name, _ in records]
+    report = {}
+
+    print("\n" + "="*60)
+    print(f"SHARDED BENCHMARK ({method}, {count} records, batches of {batch_size})")
+    print(f"CPU cores available: {os.cpu_count()}")
+    print("="*60)
+    print("Shards\tInserts/sec\tSearches/sec\tSpeedup")
+    print("-"*60)
+
+    for shards in shard_counts:
+        directory = ShardedDirectory(shards, count * 2, method, **options)
+        try:
+            start = time.perf_counter()
+            for i in range(0, count, batch_size):
+                directory.insert_many(records[i:i + batch_size])
+            inserts = count / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for i in range(0, count, batch_size):
+                directory.search_many(names[i:i + batch_size])
+            searches = count / (time.perf_counter() - start)
+        finally:
+            directory.close()
+
+        report[shards] = {"insert": inserts, "search": searches}
+        baseline = report[shard_counts[0]]["search"]
+        print(f"{shards}\t{inserts:,.0f}\t\t{searches:,.0f}\t\t{searches / baseline:.2f}x")
+
+    print("="*60)
+    return report
+
+
+def benchmark_wal(count=2000, group_sizes=(1, 8, 64, 512), directory=None):
+    """Time logged inserts with fsync per operation against grouped commits"""
+    report = {}
+    print("\n" + "="*60)
+    print(f"WRITE-AHEAD LOG BENCHMARK ({count} inserts)")
+    print("="*60)
+    print("Group size\tOps/sec\t\tFsyncs")
+    print("-"*60)
+
+    with tempfile.TemporaryDirectory(dir=directory) as folder:
+        for label, group_size, fsync in ([("no log", None, False)]
+                                         + [(str(size), size, True) for size in group_sizes]
+                                         + [("no fsync", 64, False)]):
+            phonebook = TelephoneDirectory(count * 2, "separate_chaining", single_backend=True)
+            if group_size is not None:
+                path = os.path.join(folder, f"wal-{label.replace(' ', '-')}.log")
+                phonebook.enable_wal(path, group_size=group_size, fsync=fsync)
+            start = time.perf_counter()
+            for i in range(count):
+                phonebook.insert(f"Subscriber{i}", 9000000000 + i)
+            if phonebook.wal is not None:
+                phonebook.wal.commit()
+            elapsed = time.perf_counter() - start
+            commits = phonebook.wal.commits if phonebook.wal is not None else 0
+            phonebook.close()
+            report[label] = count / elapsed
+            print(f"{label:<10}\t{report[label]:,.0f}\t\t{commits if fsync else '-'}")
+
+    print("="*60)
+    return report
+
+
+def benchmark_cache(count=10000, lookups=100000, capacity=1000, miss_ratio=0.2,
+                    method="separate_chaining", seed=42):
+    """Time search_many on a Zipf-skewed workload without a cache and per policy
+
+    miss_ratio of the lookups are for absent names, each looked up once,
+    so they exercise negative caching and TinyLFU admission.
+    """
+    rng = random.Random(seed)
+    records, _, hits, misses = _benchmark_workload("zipf", count, lookups, rng)
+    keys = [misses[i] if rng.random() < miss_ratio else key for i, key in enumerate(hits)]
+    report = {}
+
+    print("\n" + "="*60)
+    print(f"LOOKUP CACHE BENCHMARK ({method}, {count} records, {lookups} Zipf lookups, "
+          f"capacity {capacity})")
+    print("="*60)
+    print("Cache		ns/lookup	Hit ratio	Evictions")
+    print("-"*60)
+
+    for policy in (None,) + LookupCache.POLICIES:
+        phonebook = TelephoneDirectory(count * 2, method, single_backend=True)
+        with redirect_stdout(io.StringIO()):
+            phonebook.bulk_load(records)
+        if policy is not None:
+            phonebook.enable_cache(capacity, policy)
+        start = time.perf_counter()
+        for key in keys:
+            phonebook.search_many((key,))
+        ns = (time.perf_counter() - start) * 1e9 / lookups
+        cache = phonebook.cache
+        report[policy or "none"] = {"ns_per_lookup": ns,
+                                    "hit_ratio": cache.hit_ratio() if cache else 0.0}
+        print(f"{policy or 'none':<10}\t{ns:,.0f}\t\t"
+              f"{cache.hit_ratio() if cache else 0:.1%}\t\t{cache.evictions if cache else '-'}")
+
+    print("="*60)
+    return report
+
+
+def benchmark_name_search(count=1000000, queries=1000, max_distances=(1, 2), seed=42):
+    """Latency of PrefixIndex and FuzzyIndex queries over count "First Last" names
+
+    Prefix queries use the first 4 letters of a stored name. Fuzzy
+    queries are stored names with one letter replaced.
+    """
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    parts = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 8))).title()
+             for _ in range(max(2, int(count ** 0.5) * 20))]
+    names = set()
+    while len(names) < count:
+        names.add(f"{rng.choice(parts)} {rng.choice(parts)}")
+    names = list(names)
+    targets = rng.sample(names, min(queries, count))
+    report = {}
+
+    print("\n" + "="*60)
+    print(f"NAME SEARCH BENCHMARK ({count} names, {len(targets)} queries)")
+    print("="*60)
+    start = time.perf_counter()
+    prefix_index = PrefixIndex(names)
+    built = time.perf_counter()
+    fuzzy_index = FuzzyIndex(names)
+    print(f"Build: prefix {built - start:.2f}s, fuzzy {time.perf_counter() - built:.2f}s")
+    print("Query			p50 us		p99 us")
+    print("-"*60)
+
+    def typo(name):
+        i = rng.randrange(len(name))
+        return name[:i] + rng.choice(letters) + name[i + 1:]
+
+    runs = [("prefix", lambda name: prefix_index.search(name[:4]))]
+    for distance in max_distances:
+        runs.append((f"fuzzy (distance {distance})",
+                     lambda name, distance=distance: fuzzy_index.search(typo(name), distance)))
+    for label, query in runs:
+        samples = []
+        for name in targets:
+            start = time.perf_counter_ns()
+            query(name)
+            samples.append(time.perf_counter_ns() - start)
+        samples.sort()
+        report[label] = {"p50_us": samples[len(samples) // 2] / 1000,
+                         "p99_us": samples[int(len(samples) * 0.99)] / 1000}
+        print(f"{label:<20}\t{report[label]['p50_us']:,.1f}\t\t{report[label]['p99_us']:,.1f}")
+
+    print("="*60)
+    return report
+
+
+BENCHMARK_WORKLOADS = ("uniform", "zipf", "sequential", "anagram")
+
+
+def _benchmark_workload(workload, count, operations, rng):
+    """Return (records, key_type, hit keys, miss keys) for a synthetic workload
+
+    uniform: random names, lookups spread evenly. zipf: the same, but
+    lookups follow a Zipf(1.1) popularity skew. sequential: consecutive
+    phone numbers, looked up by number. anagram: every name is an anagram
+    of the same letters, the worst case for the "sum" string hash, which
+    benchmark_suite uses for it unless hash_strategy is given.
+    """
+    if workload not in BENCHMARK_WORKLOADS:
+        raise ValueError(f"Invalid workload: {workload}")
+    if workload == "sequential":
+        records = [(f"Subscriber{i}", 9000000000 + i) for i in range(count)]
+        keys = [tel_no for _, tel_no in records]
+        misses = [8000000000 + i for i in range(operations)]
+        return records, "number", [rng.choice(keys) for _ in range(operations)], misses
+
+    names = set()
+    letters = list("abcdefghijkl")
+    while len(names) < count + operations:
+        if workload == "anagram":
+            rng.shuffle(letters)
+            names.add("".join(letters))
+        else:
+            names.add("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(10)))
+    names = sorted(names)
+    rng.shuffle(names)
+    keys, misses = names[:count], names[count:]
+    records = [(name, rng.randrange(10**9, 10**10)) for name in keys]
+    if workload == "zipf":
+        weights = []
+        total = 0.0
+        for rank in range(1, count + 1):
+            total += 1 / rank ** 1.1
+            weights.append(total)
+        hits = rng.choices(keys, cum_weights=weights, k=operations)
+    else:
+        hits = [rng.choice(keys) for _ in range(operations)]
+    return records, "name", hits, misses
+
+
+def _latency_summary(samples, total_ns=None, operations=None):
+    """ns/op (from total_ns when given) and p50/p99 of per-operation samples"""
+    samples = sorted(samples)
+    if not samples:
+        return {"ns_per_op": 0.0, "p50_ns": 0, "p99_ns": 0}
+    mean = total_ns / operations if total_ns is not None else sum(samples) / len(samples)
+    return {
+        "ns_per_op": mean,
+        "p50_ns": samples[len(samples) // 2],
+        "p99_ns": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def benchmark_suite(sizes=(1000, 10000), load_factors=(0.5, 0.75, 0.9, 0.95),
+                    workloads=BENCHMARK_WORKLOADS, methods=None, operations=2000,
+                    seed=42, output=None, **options):
+    """Time every method on reproducible workloads and return/write a JSON report
+
+    For each workload, table size (rounded up to a prime) and load factor,
+    a fixed-size table is filled to that load and timed for insert, hit
+    (of records that were stored), miss and update: mean
+    ns/op plus p50/p99 latency from per-operation timings, and memory per
+    entry. The same seed always generates the same keys. Sizes up to 1e7
+    work but take minutes per method in pure Python. With output the
+    report is also written there as JSON, ready to diff between runs.
+    """
+    clock = time.perf_counter_ns
+    results = []
+    print("\n" + "="*78)
+    print(f"BENCHMARK SUITE (seed {seed}, {operations} timed operations per case)")
+    print("="*78)
+    print("Workload\tSize\tLoad\tMethod\t\t\tInsert\tHit\tMiss\tUpdate\tB/entry")
+    print("-"*78)
+
+    for workload in workloads:
+        for size in sizes:
+            for load_factor in load_factors:
+                count = max(1, int(size * load_factor))
+                records, key_type, hits, misses = _benchmark_workload(
+                    workload, count, operations, random.Random(f"{seed}/{workload}/{size}"))
+                table_options = ({"hash_strategy": "sum", **options} if workload == "anagram"
+                                 else options)
+                for method in methods or HashTable.METHODS:
+                    table = HashTable(_next_prime(size), method, key_type=key_type,
+                                      **table_options)
+                    insert = table.insert
+                    search = table.search
+                    stride = max(1, count // operations)
+                    samples = []
+                    stored = []
+                    # Overfull probing tables print; keep that out of the report
+                    with redirect_stdout(io.StringIO()):
+                        start = clock()
+                        for i, (name, tel_no) in enumerate(records):
+                            if i % stride:
+                                if insert(name, tel_no):
+                                    stored.append(i)
+                            else:
+                                began = clock()
+                                ok = insert(name, tel_no)
+                                samples.append(clock() - began)
+                                if ok:
+                                    stored.append(i)
+                        insert_stats = _latency_summary(samples, clock() - start, count)
+                        failures = count - len(stored)
+
+                        # Only records that went in can be hits or updates
+                        live = stored or [0]
+                        if failures:
+                            field = 1 if key_type == "number" else 0
+                            present = {records[i][field] for i in stored}
+                            kept = [key for key in hits if key in present] or [None]
+                            case_hits = [kept[i % len(kept)] for i in range(operations)]
+                        else:
+                            case_hits = hits
+
+                        timings = {}
+                        for label, keys in (("hit", case_hits), ("miss", misses)):
+                            samples = []
+                            for key in keys:
+                                began = clock()
+                                search(key)
+                                samples.append(clock() - began)
+                            timings[label] = _latency_summary(samples)
+
+                        # Same key, new value: a new name for numbers, a new number for names
+                        updates = [(name + "2", tel_no) if key_type == "number"
+                                   else (name, tel_no + 1)
+                                   for name, tel_no in (records[live[i % len(live)]]
+                                                        for i in range(operations))]
+                        samples = []
+                        for name, tel_no in updates:
+                            began = clock()
+                            insert(name, tel_no)
+                            samples.append(clock() - began)
+                        timings["update"] = _latency_summary(samples)
+
+                    result = {
+                        "workload": workload,
+                        "method": method,
+                        "size": table.size,
+                        "load_factor": load_factor,
+                        "hash_strategy": table.hash_strategy,
+                        "entries": len(table),
+                        "insert_failures": failures,
+                        "insert": insert_stats,
+                        "hit": timings["hit"],
+                        "miss": timings["miss"],
+                        "update": timings["update"],
+                        "bytes_per_entry": table.memory_usage() / max(1, len(table)),
+                    }
+                    results.append(result)
+                    print(f"{workload:<10}\t{size}\t{load_factor:.2f}\t{method:<20}"
+                          f"\t{insert_stats['ns_per_op']:.0f}\t{timings['hit']['ns_per_op']:.0f}"
+                          f"\t{timings['miss']['ns_per_op']:.0f}"
+                          f"\t{timings['update']['ns_per_op']:.0f}"
+                          f"\t{result['bytes_per_entry']:.0f}"
+                          + (f"\t({failures} failed)" if failures else ""))
+
+    print("="*78)
+    report = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "seed": seed,
+            "operations": operations,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "options": options,
+        },
+        "results": results,
+    }
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {output}")
+    return report
 
 
 def run_demo():
@@ -466,7 +4139,7 @@ def run_demo():
         directory.insert(name, tel_no)
     
     # Display all methods
-    for method in directory.hashtables.keys():
+    for method in HashTable.METHODS:
         directory.display(method)
     
     # Search and compare methods
@@ -477,7 +4150,7 @@ def run_demo():
     directory.search("Zoe", compare_methods=True)
     
     # Show statistics
-    for method in directory.hashtables.keys():
+    for method in HashTable.METHODS:
         directory.stats(method)
 
 
@@ -504,10 +4177,11 @@ def main():
         print("5. Change collision handling method")
         print("6. Show statistics")
         print("7. Run demonstration")
-        print("8. Exit")
+        print("8. Autocomplete or fuzzy name search")
+        print("9. Exit")
         print("="*40)
         
-        choice = input("Enter your choice (1-8): ")
+        choice = input("Enter your choice (1-9): ")
         
         if choice == '1':
             name = input("Enter name: ")
@@ -540,12 +4214,12 @@ def main():
         
         elif choice == '5':
             print("\nAvailable methods:")
-            for i, method in enumerate(directory.hashtables.keys(), 1):
+            for i, method in enumerate(HashTable.METHODS, 1):
                 print(f"{i}. {method}")
             
             try:
-                method_choice = int(input("Select method (1-4): "))
-                methods = list(directory.hashtables.keys())
+                method_choice = int(input(f"Select method (1-{len(HashTable.METHODS)}): "))
+                methods = HashTable.METHODS
                 directory.set_method(methods[method_choice-1])
                 print(f"Method changed to {methods[method_choice-1]}")
             except (ValueError, IndexError):
@@ -558,6 +4232,18 @@ def main():
             run_demo()
         
         elif choice == '8':
+            query = input("Enter a name or the start of one: ")
+            records = directory.complete(query)
+            if records:
+                print(f"\nNames starting with '{query}':")
+                for record in records:
+                    print(record)
+            else:
+                print("\nNo names with that prefix; closest matches:")
+                for record, distance in directory.fuzzy_search(query):
+                    print(f"{record} (edit distance {distance})")
+        
+        elif choice == '9':
             print("Thank you for using the Telephone Directory!")
             break
         
@@ -565,5 +4251,185 @@ def main():
             print("Invalid choice. Please try again.")
 
 
+def _cli_table(args):
+    """Table for a CLI command: mapped from --snapshot or built from --data"""
+    if args.snapshot:
+        return HashTable.load(args.snapshot, use_mmap=True)
+    if not args.data:
+        raise SystemExit("error: give --snapshot or --data")
+    table = HashTable(1024, args.method, max_load_factor=args.load_factor,
+                      key_type=args.by, storage=args.storage)
+    # Progress reports go to stderr so stdout stays clean for results
+    with redirect_stdout(sys.stderr):
+        start = time.perf_counter()
+        for chunk in read_records(args.data, args.format):
+            for name, tel_no in chunk:
+                table.insert(name, tel_no)
+        print(f"Loaded {len(table)} records in {time.perf_counter() - start:.3f}s")
+    return table
+
+
+def _read_keys(path):
+    """Yield non-blank keys, one per line, from a file or stdin ("-")"""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in f:
+            key = line.strip()
+            if key:
+                yield key
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _cli_query(args):
+    """Answer every key with one tab-separated line, written a batch at a time"""
+    table = _cli_table(args)
+    by_number = table.key_type == "number"
+    out = sys.stdout
+    start = time.perf_counter()
+    answered = hits = 0
+    batch = []
+
+    def flush():
+        nonlocal answered, hits
+        keys = []
+        for key in batch:
+            try:
+                keys.append(parse_number(key) if by_number else key)
+            except ValueError:
+                keys.append(None)
+        found = table.search_many([key for key in keys if key is not None])
+        lines = []
+        results = iter(found)
+        for key, parsed in zip(batch, keys):
+            record = next(results) if parsed is not None else None
+            if record is None:
+                lines.append(f"{key}\tNOT_FOUND\n" if parsed is not None else f"{key}\tINVALID\n")
+            else:
+                hits += 1
+                lines.append(f"{key}\t{record.name}\t{record.tel_no}\n")
+        out.write("".join(lines))
+        answered += len(batch)
+        batch.clear()
+
+    for key in _read_keys(args.keys):
+        batch.append(key)
+        if len(batch) >= args.batch:
+            flush()
+    flush()
+    out.flush()
+    elapsed = time.perf_counter() - start
+    rate = answered / elapsed if elapsed > 0 else float("inf")
+    print(f"Answered {answered} lookups ({hits} found) in {elapsed:.3f}s "
+          f"({rate:,.0f} lookups/sec)", file=sys.stderr)
+
+
+def _cli_load(args):
+    """Build a table from a CSV/JSONL file and save it as a snapshot"""
+    table = _cli_table(args)
+    table.save(args.output)
+    print(f"Saved {len(table)} records ({table.method}, {table.size} slots) to {args.output}")
+
+
+def _cli_stats(args):
+    """Print statistics and memory use of a snapshot or data file"""
+    table = _cli_table(args)
+    table.stats()
+    print(f"Memory: {table.memory_usage():,} bytes")
+    if table.read_only:
+        print(f"Mapped snapshot: {os.path.getsize(args.snapshot):,} bytes (shared page cache)")
+
+
+def _cli_bench(args):
+    """Run one of the built-in benchmarks"""
+    methods = args.methods.split(",") if args.methods else None
+    if args.suite == "search":
+        benchmark_search(args.count, args.lookups, methods)
+    elif args.suite == "sharded":
+        benchmark_sharded(args.count)
+    elif args.suite == "wal":
+        benchmark_wal(args.count)
+    elif args.suite == "concurrency":
+        for method in methods or ["separate_chaining"]:
+            concurrency_stress_test(args.count, args.lookups, method=method)
+    elif args.suite == "cache":
+        for method in methods or ["separate_chaining"]:
+            benchmark_cache(args.count, args.lookups, method=method)
+    elif args.suite == "names":
+        benchmark_name_search(args.count, min(args.lookups, 1000))
+    elif args.suite == "suite":
+        benchmark_suite(sizes=[int(float(size)) for size in args.sizes.split(",")],
+                        load_factors=[float(load) for load in args.load_factors.split(",")],
+                        workloads=args.workloads.split(","), methods=methods,
+                        operations=args.lookups, seed=args.seed, output=args.output)
+
+
+def build_parser():
+    """argparse parser for the load/query/bench/stats command line"""
+    parser = argparse.ArgumentParser(
+        description="Telephone directory hash tables (run without arguments for the menu)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_source(command):
+        command.add_argument("--snapshot", help="snapshot written by 'load' (memory-mapped)")
+        command.add_argument("--data", help="CSV/JSONL records to build the table from")
+        command.add_argument("--format", choices=("csv", "jsonl"),
+                             help="record format (default: from the extension)")
+        command.add_argument("--method", choices=HashTable.METHODS, default="separate_chaining")
+        command.add_argument("--by", choices=("name", "number"), default="name",
+                             help="key the table is searched by")
+        command.add_argument("--storage", choices=("objects", "compact"), default="objects")
+        command.add_argument("--load-factor", type=float, default=0.7,
+                             help="grow the table above this load factor")
+
+    load = commands.add_parser("load", help="build a table from CSV/JSONL and save a snapshot")
+    add_source(load)
+    load.add_argument("--output", "-o", required=True, help="snapshot file to write")
+    load.set_defaults(handler=_cli_load)
+
+    query = commands.add_parser("query", help="look up keys from a file or stdin")
+    add_source(query)
+    query.add_argument("--keys", default="-", help="file with one key per line (default stdin)")
+    query.add_argument("--batch", type=int, default=10000, help="keys per search_many call")
+    query.set_defaults(handler=_cli_query)
+
+    stats = commands.add_parser("stats", help="show table statistics")
+    add_source(stats)
+    stats.set_defaults(handler=_cli_stats)
+
+    bench = commands.add_parser("bench", help="run a benchmark")
+    bench.add_argument("suite", nargs="?", default="search",
+                       choices=("search", "sharded", "wal", "concurrency", "cache", "names",
+                                "suite"))
+    bench.add_argument("--count", type=int, default=10000, help="records to load")
+    bench.add_argument("--lookups", type=int, default=100000, help="lookups to time")
+    bench.add_argument("--methods", help="comma-separated methods (default: all)")
+    bench.add_argument("--sizes", default="1e3,1e4", help="suite: comma-separated table sizes")
+    bench.add_argument("--load-factors", default="0.5,0.75,0.9,0.95",
+                       help="suite: comma-separated load factors")
+    bench.add_argument("--workloads", default=",".join(BENCHMARK_WORKLOADS),
+                       help="suite: comma-separated workloads")
+    bench.add_argument("--seed", type=int, default=42, help="suite: workload seed")
+    bench.add_argument("--output", "-o", help="suite: write the JSON report here")
+    bench.set_defaults(handler=_cli_bench)
+    return parser
+
+
+def cli(argv=None):
+    """Command line entry point; falls back to the interactive menu without arguments"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        main()
+        return
+    args = build_parser().parse_args(argv)
+    try:
+        args.handler(args)
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head): stop quietly
+        sys.stdout = open(os.devnull, "w")
+        sys.exit(1)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    cli()
\ No newline at end of file
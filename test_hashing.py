@@ -0,0 +1,819 @@
+"""Regression tests for 1_Hashing.py
+
+Run with: python -m pytest -q  (or python -m unittest test_hashing)
+"""
+
+import asyncio
+import contextlib
+import importlib
+import io
+import itertools
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+
+hashing = importlib.import_module("1_Hashing")
+HashTable = hashing.HashTable
+TelephoneDirectory = hashing.TelephoneDirectory
+WriteAheadLog = hashing.WriteAheadLog
+
+
+def make_records(count, seed=7):
+    """Distinct (name, tel_no) pairs"""
+    rng = random.Random(seed)
+    numbers = rng.sample(range(9000000000, 9999999999), count)
+    return [(f"Subscriber{i}", number) for i, number in enumerate(numbers)]
+
+
+def as_pairs(records):
+    return sorted((record.name, record.tel_no) for record in records)
+
+
+def levenshtein(a, b):
+    """Plain edit distance, the reference for FuzzyIndex"""
+    row = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        previous, row[0] = row[0], i
+        for j, y in enumerate(b, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (x != y))
+    return row[-1]
+
+
+class WriteAheadLogTest(unittest.TestCase):
+    """Replay recovers every intact record and drops a torn or corrupt tail"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "directory.wal")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write_log(self, records):
+        directory = TelephoneDirectory(101, "separate_chaining", single_backend=True)
+        directory.enable_wal(self.path, fsync=False)
+        for name, tel_no in records:
+            directory.insert(name, tel_no)
+        directory.delete(records[0][0])
+        directory.close()
+
+    def recovered(self):
+        directory = TelephoneDirectory(101, "separate_chaining", single_backend=True)
+        replayed = directory.enable_wal(self.path, fsync=False)
+        return directory, replayed
+
+    def test_replay_after_clean_close(self):
+        records = make_records(20)
+        self.write_log(records)
+        directory, replayed = self.recovered()
+        self.assertEqual(replayed, 21)
+        self.assertIsNone(directory.search_many([records[0][0]])[0])
+        self.assertEqual(as_pairs(directory._primary().records()), sorted(records[1:]))
+        directory.close()
+
+    def test_replay_after_truncated_tail(self):
+        records = make_records(20)
+        self.write_log(records)
+        size = os.path.getsize(self.path)
+        with open(self.path, "r+b") as f:
+            # Tear the last record (the delete) in the middle
+            f.truncate(size - 5)
+
+        directory, replayed = self.recovered()
+        self.assertEqual(replayed, 20)
+        self.assertEqual(as_pairs(directory._primary().records()), sorted(records))
+
+        # The torn bytes are cut off, so later appends replay cleanly
+        directory.insert("AfterCrash", 1)
+        directory.close()
+        self.assertEqual(WriteAheadLog.replay(self.path)[-1], (hashing._WAL_INSERT, "AfterCrash", 1))
+        self.assertEqual(len(WriteAheadLog.replay(self.path)), 21)
+
+    def test_replay_stops_at_corrupt_record(self):
+        records = make_records(10)
+        self.write_log(records)
+        with open(self.path, "r+b") as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+        self.assertEqual(len(WriteAheadLog.replay(self.path)), 10)
+
+    def test_checkpoint_then_replay(self):
+        snapshot = os.path.join(self.folder.name, "directory.snap")
+        records = make_records(30)
+        directory = TelephoneDirectory(101, "separate_chaining", single_backend=True)
+        directory.enable_wal(self.path, snapshot_path=snapshot, fsync=False)
+        for name, tel_no in records[:20]:
+            directory.insert(name, tel_no)
+        directory.checkpoint()
+        for name, tel_no in records[20:]:
+            directory.insert(name, tel_no)
+        directory.close()
+
+        restored = TelephoneDirectory(101, "separate_chaining", single_backend=True)
+        self.assertEqual(restored.enable_wal(self.path, snapshot_path=snapshot, fsync=False), 10)
+        self.assertEqual(as_pairs(restored._primary().records()), sorted(records))
+        restored.close()
+
+    def test_group_delay_commits_without_further_appends(self):
+        log = WriteAheadLog(self.path, group_size=100, group_delay=0.02, fsync=False)
+        log.append(hashing._WAL_INSERT, "Alice", 1)
+        log.append(hashing._WAL_INSERT, "Bob", 2)
+        self.assertEqual(WriteAheadLog.replay(self.path), [])
+        deadline = time.monotonic() + 5
+        while not WriteAheadLog.replay(self.path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(WriteAheadLog.replay(self.path)), 2)
+        self.assertEqual(log.commits, 1)
+        log.close()
+        self.assertEqual(log.commits, 1)
+
+
+class ResizeTest(unittest.TestCase):
+    """Load-factor driven growth and shrinking, and incremental rehash"""
+
+    def test_grows_past_max_load_factor(self):
+        for method in HashTable.METHODS:
+            with self.subTest(method=method):
+                table = HashTable(11, method, max_load_factor=0.7)
+                records = make_records(200)
+                for name, tel_no in records:
+                    self.assertTrue(table.insert(name, tel_no))
+                self.assertGreater(table.size, 200 / 0.7 - 1)
+                self.assertGreater(table.resize_count, 0)
+                self.assertEqual(as_pairs(table.records()), sorted(records))
+
+    def test_shrinks_but_not_below_min_size(self):
+        table = HashTable(11, "linear_probing", max_load_factor=0.7, min_load_factor=0.2)
+        records = make_records(200)
+        for name, tel_no in records:
+            table.insert(name, tel_no)
+        grown = table.size
+        for name, _ in records[:190]:
+            self.assertTrue(table.delete(name))
+        self.assertLess(table.size, grown)
+        for name, _ in records[190:]:
+            table.delete(name)
+        self.assertGreaterEqual(table.size, table.min_size)
+        self.assertEqual(len(table), 0)
+
+    def test_incremental_rehash_keeps_every_record_reachable(self):
+        for method in HashTable.METHODS:
+            with self.subTest(method=method):
+                table = HashTable(11, method, max_load_factor=0.7,
+                                  incremental_rehash=True, rehash_step=1)
+                records = make_records(150)
+                seen_rehash = False
+                for i, (name, tel_no) in enumerate(records):
+                    table.insert(name, tel_no)
+                    seen_rehash = seen_rehash or table._old is not None
+                    for other, number in records[:i + 1:17]:
+                        self.assertEqual(table.search(other)[0].tel_no, number)
+                self.assertTrue(seen_rehash)
+                self.assertEqual(len(table), len(records))
+                self.assertEqual(as_pairs(table.records()), sorted(records))
+
+    def test_update_that_triggers_resize_is_kept(self):
+        table = HashTable(5, "linear_probing", max_load_factor=0.7,
+                          incremental_rehash=True, rehash_step=1)
+        for i in range(3):
+            table.insert(f"k{i}", i)
+        # Counted as one more record, this update starts a resize
+        table.insert("k0", 99)
+        for i in range(3, 20):
+            table.insert(f"k{i}", i)
+        self.assertEqual(table.search("k0")[0].tel_no, 99)
+        self.assertEqual(len(table), 20)
+
+
+class TombstoneTest(unittest.TestCase):
+    """Deletes leave probe chains intact and too many tombstones trigger compaction"""
+
+    OPEN_ADDRESSING = ("linear_probing", "quadratic_probing", "double_hashing")
+
+    def test_delete_keeps_later_records_reachable(self):
+        for method in HashTable.METHODS:
+            with self.subTest(method=method):
+                table = HashTable(53, method, max_tombstone_ratio=1.0)
+                records = make_records(30)
+                for name, tel_no in records:
+                    table.insert(name, tel_no)
+                for name, _ in records[::2]:
+                    self.assertTrue(table.delete(name))
+                self.assertFalse(table.delete(records[0][0]))
+                for name, tel_no in records[1::2]:
+                    self.assertEqual(table.search(name)[0].tel_no, tel_no)
+                for name, _ in records[::2]:
+                    self.assertIsNone(table.search(name)[0])
+                self.assertEqual(len(table), 15)
+
+    def test_tombstones_are_counted_and_reused(self):
+        for method in self.OPEN_ADDRESSING:
+            with self.subTest(method=method):
+                table = HashTable(53, method, max_tombstone_ratio=1.0)
+                for name, tel_no in make_records(20):
+                    table.insert(name, tel_no)
+                table.delete("Subscriber3")
+                self.assertEqual(table.tombstones, 1)
+                table.insert("Subscriber3", 5)
+                self.assertLessEqual(table.tombstones, 1)
+                self.assertEqual(table.search("Subscriber3")[0].tel_no, 5)
+
+    def test_compaction_past_tombstone_ratio(self):
+        for method in self.OPEN_ADDRESSING:
+            with self.subTest(method=method):
+                table = HashTable(53, method, max_tombstone_ratio=0.1)
+                records = make_records(40)
+                for name, tel_no in records:
+                    table.insert(name, tel_no)
+                for name, _ in records[:20]:
+                    table.delete(name)
+                self.assertGreater(table.compaction_count, 0)
+                self.assertLessEqual(table.tombstones, 0.1 * table.size)
+                self.assertEqual(as_pairs(table.records()), sorted(records[20:]))
+
+    def test_directory_delete_updates_number_index(self):
+        directory = TelephoneDirectory(53)
+        directory.insert("Alice", 555)
+        directory.insert("Bob", 555)
+        self.assertTrue(directory.delete("Alice"))
+        self.assertEqual(directory.lookup_number(555).name, "Bob")
+        directory.delete("Bob")
+        self.assertIsNone(directory.lookup_number(555))
+        self.assertEqual(directory.search_many(["Alice", "Bob"]), [None, None])
+
+
+class RobinHoodTest(unittest.TestCase):
+    """Robin hood inserts keep probe distances ordered; deletes shift back"""
+
+    def check_invariants(self, table):
+        for index, record in enumerate(table.table):
+            distance = table.distances[index]
+            if record is None:
+                self.assertEqual(distance, -1)
+                continue
+            home = table.hash_function(record.name)
+            self.assertEqual(distance, (index - home) % table.size)
+            # A record further from home never sits behind a closer one
+            following = (index + 1) % table.size
+            if table.table[following] is not None:
+                self.assertLessEqual(table.distances[following], distance + 1)
+
+    def test_inserts_and_backward_shift_deletes(self):
+        table = HashTable(101, "robin_hood")
+        records = make_records(80)
+        for name, tel_no in records:
+            table.insert(name, tel_no)
+        self.check_invariants(table)
+        for name, _ in records[::3]:
+            self.assertTrue(table.delete(name))
+            self.check_invariants(table)
+        self.assertEqual(table.tombstones, 0)
+        self.assertNotIn(hashing._TOMBSTONE, list(table.table))
+        self.assertEqual(as_pairs(table.records()),
+                         sorted(record for i, record in enumerate(records) if i % 3))
+
+    def test_miss_stops_early(self):
+        table = HashTable(101, "robin_hood")
+        for name, tel_no in make_records(50):
+            table.insert(name, tel_no)
+        longest = max(table.distances)
+        for i in range(50):
+            self.assertLessEqual(table.search(f"Missing{i}")[1], longest + 2)
+
+
+class CuckooTest(unittest.TestCase):
+    """Two independent buckets per key and a bounded stash"""
+
+    def test_colliding_first_hashes_still_fit(self):
+        # Under the "sum" strategy anagrams share their first bucket
+        names = ["".join(p) for p in itertools.permutations("abcdef")][:600]
+        table = HashTable(101, "cuckoo", hash_strategy="sum")
+        for i, name in enumerate(names):
+            self.assertTrue(table.insert(name, i))
+        self.assertLessEqual(len(table.stash), HashTable.CUCKOO_STASH_SIZE)
+        self.assertLess(table.resize_count, 20)
+        for i, name in enumerate(names):
+            self.assertEqual(table.search(name)[0].tel_no, i)
+
+    def test_lookup_checks_two_buckets_and_stash(self):
+        table = HashTable(211, "cuckoo")
+        records = make_records(150)
+        for name, tel_no in records:
+            table.insert(name, tel_no)
+        limit = 2 * HashTable.CUCKOO_BUCKET_SIZE + len(table.stash)
+        for name, tel_no in records:
+            record, comparisons = table.search(name)
+            self.assertEqual(record.tel_no, tel_no)
+            self.assertLessEqual(comparisons, limit)
+        self.assertLessEqual(table.search("Missing")[1], limit)
+
+    def test_delete(self):
+        table = HashTable(101, "cuckoo")
+        records = make_records(60)
+        for name, tel_no in records:
+            table.insert(name, tel_no)
+        for name, _ in records[::2]:
+            self.assertTrue(table.delete(name))
+        self.assertFalse(table.delete(records[0][0]))
+        self.assertEqual(as_pairs(table.records()), sorted(records[1::2]))
+
+
+class SwissTableTest(unittest.TestCase):
+    """Control bytes mirror the slots and group probes find every record"""
+
+    def check_control_bytes(self, table):
+        self.assertEqual(table.size % hashing._GROUP_WIDTH, 0)
+        deleted = 0
+        for slot, record in enumerate(table.table):
+            control = table.ctrl[slot]
+            if record is None:
+                self.assertIn(control, (hashing._CTRL_EMPTY, hashing._CTRL_DELETED))
+                deleted += control == hashing._CTRL_DELETED
+            else:
+                self.assertEqual(control, table._swiss_hash(record.name)[1])
+        self.assertEqual(deleted, table.tombstones)
+
+    def test_inserts_and_deletes(self):
+        table = HashTable(101, "swiss_table", max_tombstone_ratio=1.0)
+        records = make_records(70)
+        for name, tel_no in records:
+            self.assertTrue(table.insert(name, tel_no))
+        self.check_control_bytes(table)
+        for name, _ in records[::2]:
+            self.assertTrue(table.delete(name))
+        self.check_control_bytes(table)
+        for name, tel_no in records[1::2]:
+            self.assertEqual(table.search(name)[0].tel_no, tel_no)
+        for name, _ in records[::2]:
+            self.assertIsNone(table.search(name)[0])
+
+    def test_update_keeps_one_copy(self):
+        table = HashTable(64, "swiss_table")
+        table.insert("Alice", 1)
+        table.insert("Alice", 2)
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table.search("Alice")[0].tel_no, 2)
+        self.check_control_bytes(table)
+
+
+class SearchManyTest(unittest.TestCase):
+    """search_many() agrees with one search() per key"""
+
+    def check_parity(self, table, keys):
+        expected = [table.search(key)[0] for key in keys]
+        found = table.search_many(keys)
+        self.assertEqual(len(found), len(keys))
+        for key, record, other in zip(keys, found, expected):
+            if other is None:
+                self.assertIsNone(record, key)
+            else:
+                self.assertEqual((record.name, record.tel_no), (other.name, other.tel_no))
+
+    def test_parity_by_name(self):
+        records = make_records(500)
+        keys = [name for name, _ in records[::3]] + [f"Missing{i}" for i in range(100)]
+        random.Random(1).shuffle(keys)
+        for method in HashTable.METHODS:
+            for storage in ("objects", "compact"):
+                with self.subTest(method=method, storage=storage):
+                    table = HashTable.from_records(records, method, 0.8, storage=storage)
+                    for name, _ in records[::7]:
+                        table.delete(name)
+                    self.check_parity(table, keys)
+
+    def test_parity_by_number(self):
+        # Compact tables keyed by number take the vectorized path when NumPy is present
+        records = make_records(500)
+        keys = [tel_no for _, tel_no in records[::2]] + list(range(100, 200))
+        random.Random(2).shuffle(keys)
+        for method in HashTable.METHODS:
+            for storage in ("objects", "compact"):
+                with self.subTest(method=method, storage=storage):
+                    table = HashTable.from_records(records, method, 0.8, storage=storage,
+                                                   key_type="number")
+                    self.check_parity(table, keys)
+
+    @unittest.skipIf(hashing.np is None, "NumPy is not installed")
+    def test_vectorized_home_hits(self):
+        records = make_records(200)
+        table = HashTable.from_records(records, "linear_probing", 0.5, storage="compact",
+                                       key_type="number")
+        keys = [tel_no for _, tel_no in records]
+        positions, _ = table._home_hits(hashing.np.asarray(keys, dtype=hashing.np.int64))
+        self.assertGreater(len(positions), 0)
+        self.check_parity(table, keys)
+
+    def test_mixed_keys_on_number_table(self):
+        # Names and numbers outside int64 cannot go through the vectorized gather
+        records = make_records(100)
+        keys = [tel_no for _, tel_no in records[:40]] + ["Subscriber1", 2**70, -5, 2**63]
+        for storage in ("objects", "compact"):
+            with self.subTest(storage=storage):
+                table = HashTable.from_records(records, "linear_probing", 0.5,
+                                               storage=storage, key_type="number")
+                found = table.search_many(keys)
+                self.assertEqual([record.tel_no for record in found[:40]],
+                                 [tel_no for _, tel_no in records[:40]])
+                self.assertEqual(found[40:], [None] * 4)
+                self.check_parity(table, keys)
+
+    def test_parity_during_incremental_rehash(self):
+        table = HashTable(11, "separate_chaining", max_load_factor=0.75,
+                          incremental_rehash=True, rehash_step=1)
+        records = make_records(40)
+        for name, tel_no in records:
+            table.insert(name, tel_no)
+        self.check_parity(table, [name for name, _ in records] + ["Missing"])
+
+    def test_directory_parity(self):
+        directory = TelephoneDirectory(211, "linear_probing")
+        records = make_records(100)
+        directory.insert_many(records)
+        keys = [name for name, _ in records[:30]] + [tel_no for _, tel_no in records[30:60]]
+        keys += ["Missing", 1]
+        found = directory.search_many(keys)
+        for key, record in zip(keys, found):
+            expected = (directory.lookup_number(key) if isinstance(key, int)
+                        else directory._find_name(key))
+            self.assertIs(record, expected)
+
+
+class ConcurrentReadTest(unittest.TestCase):
+    """Lock-free readers never see a wrong record while writers run"""
+
+    def test_readers_during_writes_and_resizes(self):
+        table = hashing.ConcurrentHashTable(11, "linear_probing", max_load_factor=0.7)
+        stable = make_records(200)
+        for name, tel_no in stable:
+            table.insert(name, tel_no)
+        errors = []
+        done = threading.Event()
+
+        def read():
+            rng = random.Random(threading.get_ident())
+            while not done.is_set():
+                name, tel_no = stable[rng.randrange(len(stable))]
+                record = table.search(name)[0]
+                if record is None or record.tel_no != tel_no:
+                    errors.append((name, record))
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        try:
+            for i in range(3000):
+                table.insert(f"Churn{i}", i)
+                if i % 3 == 0:
+                    table.delete(f"Churn{i // 2}")
+        finally:
+            done.set()
+            for reader in readers:
+                reader.join()
+        self.assertEqual(errors, [])
+
+    def test_bad_key_raises_instead_of_retrying(self):
+        table = hashing.ConcurrentHashTable(11, "separate_chaining")
+        table.insert("Alice", 1)
+        with self.assertRaises(TypeError):
+            table.search([1, 2])
+        self.assertEqual(table.search("Alice")[0].tel_no, 1)
+
+
+class ShardedDirectoryTest(unittest.TestCase):
+    """Shard workers report which records they stored"""
+
+    def test_refused_inserts_are_reported_and_not_indexed(self):
+        directory = hashing.ShardedDirectory(2, 10, "linear_probing")
+        try:
+            records = make_records(30)
+            with contextlib.redirect_stdout(io.StringIO()):
+                stored = directory.insert_many(records)
+            self.assertEqual(len(stored), 30)
+            self.assertEqual(sum(stored), 10)
+            found = directory.search_many([tel_no for _, tel_no in records])
+            for (name, tel_no), ok, record in zip(records, stored, found):
+                if ok:
+                    self.assertEqual((record.name, record.tel_no), (name, tel_no))
+                else:
+                    self.assertIsNone(record)
+                    self.assertIsNone(directory.search(name))
+        finally:
+            directory.close()
+
+
+class AsyncDirectoryTest(unittest.TestCase):
+    """Batched requests resolve, and close() fails the ones left over"""
+
+    def test_concurrent_requests(self):
+        async def scenario():
+            front = hashing.AsyncDirectory(TelephoneDirectory(101), window=0.01)
+            records = make_records(50)
+            inserted = await asyncio.gather(*(front.ainsert(name, tel_no)
+                                              for name, tel_no in records))
+            found = await asyncio.gather(*(front.asearch(name) for name, _ in records))
+            await front.close()
+            return records, inserted, found, front.batches
+
+        records, inserted, found, batches = asyncio.run(scenario())
+        self.assertTrue(all(inserted))
+        self.assertEqual([record.tel_no for record in found], [tel_no for _, tel_no in records])
+        self.assertLess(batches, 100)
+
+    def test_close_fails_batch_being_collected(self):
+        async def scenario():
+            front = hashing.AsyncDirectory(TelephoneDirectory(101), window=10)
+            request = asyncio.ensure_future(front.asearch("Alice"))
+            # Let the batcher take the request and start waiting for more
+            for _ in range(5):
+                await asyncio.sleep(0)
+            self.assertEqual(len(front._batch), 1)
+            await front.close()
+            with self.assertRaises(RuntimeError):
+                await asyncio.wait_for(request, 1)
+
+        asyncio.run(scenario())
+
+
+class SnapshotTest(unittest.TestCase):
+    """save() / load() keep every record and the table layout"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "table.snap")
+        self.records = make_records(300)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_round_trip_every_method_and_storage(self):
+        for method in HashTable.METHODS:
+            for storage in ("objects", "compact"):
+                with self.subTest(method=method, storage=storage):
+                    table = HashTable.from_records(self.records, method, storage=storage)
+                    table.delete("Subscriber3")
+                    table.save(self.path)
+
+                    for use_mmap in (False, True):
+                        loaded = HashTable.load(self.path, use_mmap=use_mmap)
+                        self.assertEqual(len(loaded), len(table))
+                        self.assertEqual(loaded.size, table.size)
+                        self.assertEqual(as_pairs(loaded.records()), as_pairs(table.records()))
+                        for name, tel_no in self.records[:50]:
+                            expected = table.search(name)[0]
+                            found = loaded.search(name)[0]
+                            if expected is None:
+                                self.assertIsNone(found)
+                            else:
+                                self.assertEqual(found.tel_no, tel_no)
+                        del loaded
+
+    def test_loaded_table_accepts_writes(self):
+        table = HashTable.from_records(self.records, "linear_probing")
+        table.save(self.path)
+        loaded = HashTable.load(self.path)
+        self.assertTrue(loaded.insert("Newcomer", 1234567890))
+        self.assertEqual(loaded.search("Newcomer")[0].tel_no, 1234567890)
+
+    def test_mapped_table_is_read_only(self):
+        HashTable.from_records(self.records, "separate_chaining").save(self.path)
+        mapped = HashTable.load(self.path, use_mmap=True)
+        with self.assertRaises(TypeError):
+            mapped.insert("Newcomer", 1234567890)
+        with self.assertRaises(TypeError):
+            mapped.delete("Subscriber1")
+        del mapped
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a snapshot" * 10)
+        with self.assertRaises(ValueError):
+            HashTable.load(self.path)
+
+
+class ImportExportTest(unittest.TestCase):
+    """Streaming CSV/JSONL import and export keep every table and index in step"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.folder.name, name)
+
+    def import_quietly(self, directory, path, **options):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            report = hashing.import_records(directory, path, **options)
+        return report, output.getvalue()
+
+    def test_round_trip(self):
+        records = make_records(120)
+        source = TelephoneDirectory(401, single_backend=True)
+        source.insert_many(records)
+        for name in ("records.csv", "records.jsonl", "records.csv.gz"):
+            with self.subTest(file=name):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(hashing.export_records(source, self.path(name)), 120)
+                restored = TelephoneDirectory(401, single_backend=True)
+                report, _ = self.import_quietly(restored, self.path(name), chunk_size=50)
+                self.assertEqual(report["imported"], 120)
+                self.assertEqual(as_pairs(restored._primary().records()), sorted(records))
+
+    def test_invalid_rows_are_counted(self):
+        with open(self.path("bad.csv"), "w") as f:
+            f.write("name,tel_no\nAlice,555\nBob,not a number\n,123\nCarol,777\n")
+        directory = TelephoneDirectory(101)
+        report, _ = self.import_quietly(directory, self.path("bad.csv"))
+        self.assertEqual((report["imported"], report["invalid"]), (2, 2))
+        self.assertEqual(report["first_invalid_lines"], [3, 4])
+        with self.assertRaises(ValueError):
+            self.import_quietly(directory, self.path("bad.csv"), on_error="raise")
+
+    def test_import_grows_small_tables(self):
+        records = make_records(1000)
+        with open(self.path("big.csv"), "w") as f:
+            f.write("name,tel_no\n")
+            f.writelines(f"{name},{tel_no}\n" for name, tel_no in records)
+        directory = TelephoneDirectory()
+        report, output = self.import_quietly(directory, self.path("big.csv"), chunk_size=300)
+        self.assertEqual((report["imported"], report["failed"]), (1000, 0))
+        self.assertNotIn("full", output)
+        for method, table in directory.hashtables.items():
+            with self.subTest(method=method):
+                self.assertEqual(as_pairs(table.records()), sorted(records))
+        self.assertEqual(len(directory.number_index), 1000)
+
+    def test_refused_record_is_left_out_everywhere(self):
+        directory = TelephoneDirectory(101)
+        table = directory.hashtables["double_hashing"]
+        insert = table.insert
+        table.insert = lambda record, value=None: (record.name != "Bob"
+                                                   and insert(record, value))
+        stored = directory.insert_many([("Alice", 1), ("Bob", 2), ("Carol", 3)])
+        self.assertEqual(stored, 2)
+        for method, hashtable in directory.hashtables.items():
+            with self.subTest(method=method):
+                self.assertIsNone(hashtable.search("Bob")[0])
+                self.assertEqual(len(hashtable), 2)
+        self.assertIsNone(directory.lookup_number(2))
+
+
+class MetricsTest(unittest.TestCase):
+    """metrics() reports without changing the table"""
+
+    def test_metrics_leave_incremental_rehash_alone(self):
+        for method in ("separate_chaining", "linear_probing"):
+            with self.subTest(method=method):
+                table = HashTable(11, method, max_load_factor=0.7,
+                                  incremental_rehash=True, rehash_step=1)
+                for name, tel_no in make_records(8):
+                    table.insert(name, tel_no)
+                self.assertIsNotNone(table._old)
+                index, size = table._rehash_index, table.size
+                data = table.metrics()
+                self.assertTrue(data["rehash_in_progress"])
+                self.assertIsNotNone(table._old)
+                self.assertEqual((table._rehash_index, table.size), (index, size))
+                # Runs of both the current and the retired table are counted
+                self.assertGreater(sum(length * count for length, count
+                                       in data["cluster_lengths"].items()), 0)
+
+    def test_cluster_lengths(self):
+        table = HashTable(11, "linear_probing")
+        for key in (0, 1, 2, 5, 6, 10):
+            table.insert(key)
+        # 10, 0, 1, 2 wrap around into one run
+        self.assertEqual(table.cluster_lengths(), {4: 1, 2: 1})
+
+
+class LookupCacheTest(unittest.TestCase):
+    """Cached lookups never outlive the writes that change them"""
+
+    def setUp(self):
+        self.directory = TelephoneDirectory(101, "linear_probing")
+        self.directory.insert_many([("Alice", 555), ("Bob", 777)])
+        self.cache = self.directory.enable_cache(capacity=16)
+
+    def lookup(self, *keys):
+        return [record and (record.name, record.tel_no)
+                for record in self.directory.search_many(keys)]
+
+    def test_update_invalidates_name_and_numbers(self):
+        self.assertEqual(self.lookup("Alice", 555), [("Alice", 555)] * 2)
+        self.assertEqual(self.lookup("Alice"), [("Alice", 555)])
+        self.assertEqual(self.cache.hits, 1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.directory.insert("Alice", 999)
+        self.assertEqual(self.lookup("Alice", 555, 999), [("Alice", 999), None, ("Alice", 999)])
+        self.directory.delete("Alice")
+        self.assertEqual(self.lookup("Alice", 999), [None, None])
+
+    def test_negative_caching(self):
+        self.assertEqual(self.lookup("Carol"), [None])
+        self.assertEqual(self.lookup("Carol"), [None])
+        self.assertEqual(self.cache.negative_hits, 1)
+        self.directory.insert_many([("Carol", 123)])
+        self.assertEqual(self.lookup("Carol"), [("Carol", 123)])
+
+        cache = self.directory.enable_cache(negative=False)
+        self.lookup("Dave")
+        self.lookup("Dave")
+        self.assertEqual((cache.negative_hits, len(cache)), (0, 0))
+
+    def test_bulk_load_clears_cache(self):
+        self.lookup("Alice", "Bob")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.directory.bulk_load([("Alice", 1)])
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.lookup("Alice"), [("Alice", 1)])
+
+    def test_tinylfu_keeps_hot_keys(self):
+        for policy in hashing.LookupCache.POLICIES:
+            with self.subTest(policy=policy):
+                cache = hashing.LookupCache(capacity=32, policy=policy)
+                hot = [f"Hot{i}" for i in range(32)]
+                for _ in range(5):
+                    for key in hot:
+                        if cache.get(key) is hashing._NOT_CACHED:
+                            cache.put(key, None)
+                # A one-off scan, twice the size of the cache
+                for i in range(64):
+                    key = f"Scan{i}"
+                    if cache.get(key) is hashing._NOT_CACHED:
+                        cache.put(key, None)
+                kept = sum(key in cache.entries for key in hot)
+                if policy == "tinylfu":
+                    # The sketch may overestimate a scanned key now and then
+                    self.assertGreaterEqual(kept, 28)
+                    self.assertGreater(cache.rejections, 0)
+                else:
+                    self.assertEqual(kept, 0)
+                    self.assertGreater(cache.evictions, 0)
+
+
+class NameIndexTest(unittest.TestCase):
+    """Prefix and fuzzy search agree with a brute-force scan"""
+
+    def setUp(self):
+        rng = random.Random(3)
+        self.names = sorted({"".join(rng.choice("abcde") for _ in range(rng.randint(2, 9)))
+                             .capitalize() for _ in range(400)})
+
+    def test_prefix_search(self):
+        index = hashing.PrefixIndex(self.names)
+        for prefix in ("", "a", "AB", "cde", "eeee", "z", "Ab"):
+            with self.subTest(prefix=prefix):
+                expected = sorted((name for name in self.names
+                                   if name.casefold().startswith(prefix.casefold())),
+                                  key=str.casefold)
+                self.assertEqual(index.search(prefix, limit=len(self.names)), expected)
+                self.assertEqual(index.search(prefix, limit=3), expected[:3])
+
+    def test_fuzzy_search(self):
+        index = hashing.FuzzyIndex(self.names)
+        rng = random.Random(4)
+        queries = [name[:i] + "x" + name[i + 1:]
+                   for name in rng.sample(self.names, 20) for i in (0, len(name) // 2)]
+        queries += ["a", "ab", "abcdeabcd", "Zzzzzz"]
+        for query in queries:
+            for max_distance in (1, 2):
+                with self.subTest(query=query, max_distance=max_distance):
+                    found = index.search(query, max_distance, limit=len(self.names))
+                    expected = sorted((levenshtein(query.casefold(), name.casefold()), name)
+                                      for name in self.names)
+                    expected = [(name, distance) for distance, name in expected
+                                if distance <= max_distance]
+                    self.assertEqual(found, expected)
+
+    def test_removed_names_are_not_found(self):
+        index = hashing.FuzzyIndex(self.names)
+        removed = self.names[::2]
+        for name in removed:
+            self.assertTrue(index.remove(name))
+        self.assertFalse(index.remove(removed[0]))
+        self.assertEqual(len(index), len(self.names) - len(removed))
+        for name in removed[:20]:
+            self.assertNotIn(name, [match for match, _ in index.search(name, 0)])
+
+    def test_directory_keeps_indexes_in_step(self):
+        directory = TelephoneDirectory(101)
+        directory.insert_many([("Alice", 1), ("Alicia", 2), ("Bob", 3)])
+        self.assertEqual([record.name for record in directory.complete("ali")],
+                         ["Alice", "Alicia"])
+        directory.insert_many([("Alina", 4)])
+        directory.delete("Alice")
+        self.assertEqual([record.name for record in directory.complete("AL")],
+                         ["Alicia", "Alina"])
+        self.assertEqual([(record.name, distance)
+                          for record, distance in directory.fuzzy_search("Alica", 1)],
+                         [("Alicia", 1), ("Alina", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()